@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, Integer, DateTime, Boolean, Enum
+from sqlalchemy import Column, String, ForeignKey, Integer, DateTime, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -71,3 +71,9 @@ class Token(Base):
     issued_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User")
+
+    __table_args__ = (
+        # Purge of expired tokens and the per-user token cap
+        Index('ix_tokens_issued_at', 'issued_at'),
+        Index('ix_tokens_user_id_issued_at', 'user_id', 'issued_at'),
+    )
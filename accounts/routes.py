@@ -1,53 +1,86 @@
 import secrets
 from datetime import datetime
+from typing import Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.future import select
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import User, Role, UserRole, Token
-from .schemas import UserCreate, TokenOut, LoginData
-from database import get_db
+from .schemas import UserCreate, TokenOut, LoginData, CurrentUser
+from database import SessionLocal, get_db, get_read_db
 from common.constants import RoleName
+from security.passwords import (  # noqa: F401 - re-exported for existing imports
+    get_password_hash,
+    verify_password,
+    hash_password,
+    verify_and_update_password
+)
+from security.tokens import token_cache, token_cache_ttl, token_expiry_cutoff
+from settings import TOKEN_MAX_PER_USER
+from monitoring.tracing import traced
 
 
 router = APIRouter()
 
-# Initialize the context for hashing passwords
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
+async def get_user_by_token(token: str, db: AsyncSession) -> Optional[Tuple[User, datetime]]:
+    """The token's user and its issue time, None for unknown or expired tokens."""
+    statement = select(User, Token.issued_at).join(Token, Token.user_id == User.id).where(Token.token == token)
+    cutoff = token_expiry_cutoff()
+    if cutoff is not None:
+        statement = statement.where(Token.issued_at >= cutoff)
+    return (await db.execute(statement)).first()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
 
+@traced()
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)) -> CurrentUser:
+    current_user = token_cache.get(token)
+    if current_user is not None:
+        return current_user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    result = db.execute(select(Token).where(Token.token == token))
-    db_token = result.scalars().first()
+    row = await get_user_by_token(token, db)
+    if not row and db.info.get("replica"):
+        # A token issued a moment ago may not have reached the replica yet
+        async with SessionLocal() as primary_db:
+            row = await get_user_by_token(token, primary_db)
 
-    if not db_token:
+    if not row:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    return db_token.user
+    user, issued_at = row
+    current_user = CurrentUser.model_validate(user)
+    token_cache.set(token, current_user, ttl=token_cache_ttl(issued_at))
+    return current_user
+
+
+async def drop_oldest_tokens(user_id: int, db: AsyncSession):
+    """Make room for one more token within TOKEN_MAX_PER_USER, 0 means no cap."""
+    if TOKEN_MAX_PER_USER <= 0:
+        return
+    oldest = (await db.execute(
+        select(Token)
+        .where(Token.user_id == user_id)
+        .order_by(Token.issued_at.desc(), Token.id.desc())
+        .offset(TOKEN_MAX_PER_USER - 1)
+    )).scalars().all()
+    for token in oldest:
+        # Deleted through the session so the token cache entries are dropped on commit
+        await db.delete(token)
 
 
 @router.post("/register", response_model=TokenOut)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     statement = select(User).where(User.email == user.email)
-    result = db.execute(statement)
+    result = await db.execute(statement)
     existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
 
     new_user = User(
         email=user.email,
@@ -57,7 +90,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         last_name=user.last_name
     )
 
-    result = db.execute(select(Role).filter(Role.name == RoleName.USER))
+    result = await db.execute(select(Role).filter(Role.name == RoleName.USER))
     default_role = result.scalars().first()
     if not default_role:
         default_role = Role(name=RoleName.USER)
@@ -75,23 +108,28 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.add(user_role)
     db.add(new_token)
-    db.commit()
-    db.refresh(new_token)
+    await db.commit()
+    await db.refresh(new_token)
 
     return new_token
 
 
 @router.post("/login")
-async def login(login_data: LoginData, db: Session = Depends(get_db)):
-    result = db.execute(select(User).filter(User.email == login_data.email))
+async def login(login_data: LoginData, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).filter(User.email == login_data.email))
     user = result.scalars().first()
 
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    if not verify_password(login_data.password, user.password):
+    valid, new_hash = await verify_and_update_password(login_data.password, user.password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Stored with an outdated cost factor, upgrade it now that we know the password
+        user.password = new_hash
 
+    await drop_oldest_tokens(user.id, db)
     new_token = Token(
         token=secrets.token_hex(16),
         user=user,
@@ -99,26 +137,26 @@ async def login(login_data: LoginData, db: Session = Depends(get_db)):
     )
 
     db.add(new_token)
-    db.commit()
+    await db.commit()
 
     return {"token": new_token.token}
 
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user),
-            db: Session = Depends(get_db),
+async def logout(current_user: CurrentUser = Depends(get_current_user),
+            db: AsyncSession = Depends(get_db),
             bearer_token: str = Depends(oauth2_scheme)
            ):
     statement = select(Token).where(
         Token.user_id == current_user.id,
         Token.token == bearer_token
     )
-    token = db.execute(statement).scalars().first()
+    token = (await db.execute(statement)).scalars().first()
 
     if not token:
         raise HTTPException(status_code=404, detail="Token not found")
 
-    db.delete(token)
-    db.commit()
+    await db.delete(token)
+    await db.commit()
 
     return {"msg": "Logout successful"}
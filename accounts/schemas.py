@@ -31,6 +31,17 @@ class UserOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CurrentUser(BaseModel):
+    """Snapshot of the authenticated user, safe to cache between requests."""
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    super_user: Optional[bool] = False
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
 class RoleBase(BaseModel):
     name: RoleName
 
@@ -13,7 +13,8 @@ from accounts.models import (
     RolePermission,
     Token
 )
-from taskboard.models import Task, TaskExecutors
+from taskboard.models import Task, TaskExecutors, TableVersion
+from email_notification.models import OutboxMessage
 from settings import (
     POSTGRES_USER,
     POSTGRES_PASSWORD,
@@ -44,6 +45,20 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# Full-text search objects are created with raw DDL (see taskboard/search.py)
+# and are not in the model metadata, autogenerate must not propose dropping them
+SEARCH_OBJECTS = {("column", "search_vector"), ("index", "ix_tasks_search_vector")}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == "table":
+        # The SQLite FTS5 table and its shadow tables
+        return not name.startswith("tasks_fts")
+    return (type_, name) not in SEARCH_OBJECTS
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -66,6 +81,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -85,7 +101,8 @@ def run_migrations_online():
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
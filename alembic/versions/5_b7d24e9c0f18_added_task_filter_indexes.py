@@ -0,0 +1,33 @@
+"""added task filter indexes
+
+Revision ID: b7d24e9c0f18
+Revises: 5c1e8f2a9d37
+Create Date: 2026-10-18 11:03:17.204655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d24e9c0f18'
+down_revision: Union[str, None] = '5c1e8f2a9d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the indexes without locking the tables against writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tasks_status_priority_id', 'tasks', ['status', 'priority', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_tasks_responsible_id_id', 'tasks', ['responsible_id', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_executors_user_id_task_id', 'task_executors', ['user_id', 'task_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_executors_user_id_task_id', table_name='task_executors', postgresql_concurrently=True)
+        op.drop_index('ix_tasks_responsible_id_id', table_name='tasks', postgresql_concurrently=True)
+        op.drop_index('ix_tasks_status_priority_id', table_name='tasks', postgresql_concurrently=True)
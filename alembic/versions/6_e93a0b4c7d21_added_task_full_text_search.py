@@ -0,0 +1,67 @@
+"""added task full-text search
+
+Revision ID: e93a0b4c7d21
+Revises: b7d24e9c0f18
+Create Date: 2026-10-18 11:48:52.671390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93a0b4c7d21'
+down_revision: Union[str, None] = 'b7d24e9c0f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description, content='tasks', content_rowid='id')")
+        op.execute(
+            "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+            "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+        return
+
+    # Adding a STORED generated column rewrites the table once
+    op.execute(
+        "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_ai")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_search_vector', table_name='tasks', postgresql_concurrently=True)
+    op.drop_column('tasks', 'search_vector')
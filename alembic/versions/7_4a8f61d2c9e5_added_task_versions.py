@@ -0,0 +1,33 @@
+"""added task version and table_versions
+
+Revision ID: 4a8f61d2c9e5
+Revises: e93a0b4c7d21
+Create Date: 2026-10-18 12:31:05.918244
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a8f61d2c9e5'
+down_revision: Union[str, None] = 'e93a0b4c7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('table_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO table_versions (name, version) VALUES ('tasks', 0)")
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('tasks', 'version')
+    op.drop_table('table_versions')
@@ -0,0 +1,31 @@
+"""added token indexes
+
+Revision ID: c3d5a7e91b42
+Revises: 4a8f61d2c9e5
+Create Date: 2026-10-18 14:12:40.531207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d5a7e91b42'
+down_revision: Union[str, None] = '4a8f61d2c9e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The tokens table can be large, build the indexes without locking it against writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tokens_issued_at', 'tokens', ['issued_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_tokens_user_id_issued_at', 'tokens', ['user_id', 'issued_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tokens_user_id_issued_at', table_name='tokens', postgresql_concurrently=True)
+        op.drop_index('ix_tokens_issued_at', table_name='tokens', postgresql_concurrently=True)
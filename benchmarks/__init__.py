@@ -0,0 +1,10 @@
+"""Microbenchmarks of TaskFlow internals.
+
+Run ``python -m benchmarks --help`` or, with pytest-benchmark installed,
+``pytest benchmarks/bench_internals.py``.
+"""
+import os
+
+# The cases build their own engines from --database-url, the app's engine is
+# only created on import and never connects
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
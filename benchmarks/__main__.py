@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .cases import CASES
+from .runner import find_regressions, run
+
+
+def default_database_url() -> str:
+    path = os.path.join(tempfile.gettempdir(), "taskflow_benchmarks.db")
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Microbenchmarks of TaskFlow internals.")
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL") or default_database_url(),
+                        help="async SQLAlchemy URL of a scratch database, it is wiped (default: a temporary SQLite file)")
+    parser.add_argument("--sizes", default="10000",
+                        help="comma-separated dataset sizes in tasks, e.g. 10000,100000,1000000")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only this case (repeatable)")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown of a median against --compare (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.database_url,
+        [int(size) for size in args.sizes.split(",")],
+        case_names=args.case,
+        rounds=args.rounds,
+        warmup=args.warmup,
+        seed=args.seed
+    )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = find_regressions(json.load(baseline_file), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
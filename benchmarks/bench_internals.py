@@ -0,0 +1,52 @@
+"""pytest-benchmark entry point for the cases in ``benchmarks.cases``.
+
+    pytest benchmarks/bench_internals.py --benchmark-json=results.json
+
+BENCHMARK_DATABASE_URL and BENCHMARK_SIZES (comma-separated) select the
+datasets, pytest-benchmark's --benchmark-compare and
+--benchmark-compare-fail=median:20% detect regressions.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .__main__ import default_database_url
+from .cases import CASES, BenchmarkContext
+from .dataset import seed_dataset
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = [int(size) for size in os.getenv("BENCHMARK_SIZES", "10000").split(",")]
+
+
+@pytest.fixture(scope="module")
+def benchmark_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}_tasks")
+def context(request, benchmark_loop):
+    database_url = os.getenv("BENCHMARK_DATABASE_URL") or default_database_url()
+    options = {"poolclass": NullPool} if database_url.startswith("sqlite") else {}
+    engine = create_async_engine(database_url, **options)
+    dataset = benchmark_loop.run_until_complete(seed_dataset(engine, request.param))
+    yield BenchmarkContext(
+        sessionmaker=async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False),
+        dataset=dataset
+    )
+    benchmark_loop.run_until_complete(engine.dispose())
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_case(benchmark, benchmark_loop, context, name):
+    case = CASES[name](context)
+    run = benchmark_loop.run_until_complete(case.__aenter__())
+    try:
+        benchmark(lambda: benchmark_loop.run_until_complete(run()))
+    finally:
+        benchmark_loop.run_until_complete(case.__aexit__(None, None, None))
@@ -0,0 +1,182 @@
+"""Benchmark cases for the hot internals.
+
+Every case is an async context manager taking a ``BenchmarkContext`` and
+yielding the coroutine function to time. Setup and teardown (loading rows,
+swapping listeners) are not measured.
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from accounts.routes import get_current_user
+from accounts.schemas import CurrentUser
+from common.constants import PermissionName, TaskStatus
+from pagination import Paginator, encode_cursor
+from security.permissions import has_permission, invalidate_permission_cache
+from security.tokens import invalidate_token
+from taskboard.models import Task, after_update_listener
+from taskboard.routes import (
+    TASK_LIST_COLUMNS,
+    assign_executors,
+    get_executor_ids,
+    render_task_rows
+)
+from taskboard.schemas import TaskOut
+from .dataset import Dataset
+
+PAGE_SIZE = 50
+
+Run = Callable[[], Awaitable[object]]
+
+
+@dataclass
+class BenchmarkContext:
+    sessionmaker: async_sessionmaker
+    dataset: Dataset
+
+
+CASES: Dict[str, Callable[[BenchmarkContext], AsyncContextManager[Run]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = asynccontextmanager(setup)
+        return setup
+    return register
+
+
+def paginate_case(page_of: Callable[[int], int]):
+    async def setup(context: BenchmarkContext) -> AsyncIterator[Run]:
+        last_page = max(1, (context.dataset.task_count + PAGE_SIZE - 1) // PAGE_SIZE)
+        page = page_of(last_page)
+
+        async def run():
+            async with context.sessionmaker() as db:
+                return await Paginator(db, None).paginate(
+                    select(*TASK_LIST_COLUMNS), page=page, page_size=PAGE_SIZE
+                )
+        yield run
+    return setup
+
+
+case("paginate_offset_first_page")(paginate_case(lambda last_page: 1))
+case("paginate_offset_middle_page")(paginate_case(lambda last_page: max(1, last_page // 2)))
+case("paginate_offset_last_page")(paginate_case(lambda last_page: last_page))
+
+
+@case("paginate_cursor_last_page")
+async def paginate_cursor_last_page(context: BenchmarkContext) -> AsyncIterator[Run]:
+    async with context.sessionmaker() as db:
+        last_id = (await db.execute(select(Task.id).order_by(Task.id.desc()).limit(1))).scalar()
+    cursor = encode_cursor(None, [max(0, last_id - PAGE_SIZE)])
+
+    async def run():
+        async with context.sessionmaker() as db:
+            return await Paginator(db, None).paginate(
+                select(*TASK_LIST_COLUMNS), page_size=PAGE_SIZE, cursor=cursor
+            )
+    yield run
+
+
+def has_permission_case(cached: bool):
+    async def setup(context: BenchmarkContext) -> AsyncIterator[Run]:
+        user = CurrentUser(id=context.dataset.admin_id, email="user0@example.com", first_name="User", last_name="0")
+
+        async def run():
+            if not cached:
+                invalidate_permission_cache()
+            async with context.sessionmaker() as db:
+                return await has_permission(user, PermissionName.UPDATE_TASK, db)
+        yield run
+    return setup
+
+
+case("has_permission_cold")(has_permission_case(cached=False))
+case("has_permission_cached")(has_permission_case(cached=True))
+
+
+def get_current_user_case(cached: bool):
+    async def setup(context: BenchmarkContext) -> AsyncIterator[Run]:
+        async def run():
+            if not cached:
+                invalidate_token()
+            async with context.sessionmaker() as db:
+                return await get_current_user(context.dataset.token, db)
+        yield run
+    return setup
+
+
+case("get_current_user_cold")(get_current_user_case(cached=False))
+case("get_current_user_cached")(get_current_user_case(cached=True))
+
+
+@case("assign_executors")
+async def assign_executors_case(context: BenchmarkContext) -> AsyncIterator[Run]:
+    executor_ids = context.dataset.user_ids[:3]
+
+    async def run():
+        async with context.sessionmaker() as db:
+            task = (await db.execute(select(Task).order_by(Task.id).limit(1))).scalars().one()
+            return await assign_executors(task, executor_ids, db)
+    yield run
+
+
+async def load_page(context: BenchmarkContext):
+    async with context.sessionmaker() as db:
+        tasks = (await db.execute(select(Task).order_by(Task.id).limit(PAGE_SIZE))).scalars().all()
+        rows = (await db.execute(select(*TASK_LIST_COLUMNS).order_by(Task.id).limit(PAGE_SIZE))).all()
+        executor_ids = await get_executor_ids([task.id for task in tasks], db)
+    return tasks, rows, executor_ids
+
+
+@case("serialize_page_taskout")
+async def serialize_page_taskout(context: BenchmarkContext) -> AsyncIterator[Run]:
+    """The list serialization before the orjson fast path, for comparison."""
+    tasks, _, executor_ids = await load_page(context)
+    adapter = TypeAdapter(List[TaskOut])
+
+    async def run():
+        page = []
+        for task in tasks:
+            task.executor_ids = executor_ids[task.id]
+            page.append(TaskOut.model_validate(task))
+        return adapter.dump_json(adapter.validate_python(page))
+    yield run
+
+
+@case("serialize_page_rows")
+async def serialize_page_rows(context: BenchmarkContext) -> AsyncIterator[Run]:
+    _, rows, executor_ids = await load_page(context)
+
+    async def run():
+        return render_task_rows(rows, executor_ids)
+    yield run
+
+
+def status_update_case(with_listener: bool):
+    """Flush of a status change, rolled back so that the data stays the same."""
+    async def setup(context: BenchmarkContext) -> AsyncIterator[Run]:
+        async def run():
+            async with context.sessionmaker() as db:
+                task = (await db.execute(select(Task).order_by(Task.id).limit(1))).scalars().one()
+                task.status = TaskStatus.DONE if task.status != TaskStatus.DONE else TaskStatus.TODO
+                await db.flush()
+                await db.rollback()
+
+        if with_listener:
+            yield run
+            return
+        event.remove(Task, "after_update", after_update_listener)
+        try:
+            yield run
+        finally:
+            event.listen(Task, "after_update", after_update_listener)
+    return setup
+
+
+case("status_update_with_listener")(status_update_case(with_listener=True))
+case("status_update_without_listener")(status_update_case(with_listener=False))
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import main  # noqa: F401 - registers every model and its DDL events
+from accounts.models import Token, User
+from database import Base
+from scripts.seed_data import seed_data
+from taskboard.models import Task
+
+BENCHMARK_TOKEN = "benchmark-token"
+
+
+@dataclass
+class Dataset:
+    task_count: int
+    user_ids: List[int]
+    admin_id: int
+    token: str = BENCHMARK_TOKEN
+
+
+async def seeded_task_count(engine: AsyncEngine) -> int:
+    """Number of tasks of an existing benchmark dataset, 0 if there is none."""
+    async with engine.connect() as connection:
+        has_tables = await connection.run_sync(
+            lambda sync_connection: sync_connection.dialect.has_table(sync_connection, Token.__tablename__)
+        )
+        if not has_tables:
+            return 0
+        token = (await connection.execute(select(Token.id).where(Token.token == BENCHMARK_TOKEN))).scalar()
+        if token is None:
+            return 0
+        return (await connection.execute(select(func.count()).select_from(Task))).scalar()
+
+
+async def load_dataset(engine: AsyncEngine, task_count: int) -> Dataset:
+    async with engine.begin() as connection:
+        # Renew the token, the dataset may be older than TOKEN_TTL
+        await connection.execute(
+            update(Token).where(Token.token == BENCHMARK_TOKEN).values(issued_at=datetime.utcnow())
+        )
+        user_ids = (await connection.execute(select(User.id).order_by(User.id))).scalars().all()
+        admin_id = (await connection.execute(
+            select(Token.user_id).where(Token.token == BENCHMARK_TOKEN)
+        )).scalar()
+    return Dataset(task_count=task_count, user_ids=list(user_ids), admin_id=admin_id)
+
+
+async def seed_dataset(engine: AsyncEngine, task_count: int, seed: int = 0) -> Dataset:
+    """Recreate the schema and fill it with ``task_count`` generated tasks.
+
+    Reuses the data already in the database when it was seeded with the
+    same number of tasks.
+    """
+    if await seeded_task_count(engine) == task_count:
+        return await load_dataset(engine, task_count)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine) as db:
+        result = await db.run_sync(seed_data, max(10, task_count // 100), task_count, seed)
+        db.add(Token(token=BENCHMARK_TOKEN, user_id=result.admin_id))
+        await db.commit()
+
+    return Dataset(task_count=task_count, user_ids=result.user_ids, admin_id=result.admin_id)
@@ -0,0 +1,94 @@
+import asyncio
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .cases import CASES, BenchmarkContext
+from .dataset import seed_dataset
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Timing statistics in microseconds."""
+    durations = sorted(duration * 1e6 for duration in durations)
+    return {
+        "rounds": len(durations),
+        "min": durations[0],
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        "stdev": statistics.stdev(durations) if len(durations) > 1 else 0.0,
+    }
+
+
+async def run_case(name: str, context: BenchmarkContext, rounds: int, warmup: int) -> Dict[str, float]:
+    async with CASES[name](context) as run:
+        for _ in range(warmup):
+            await run()
+        durations = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await run()
+            durations.append(time.perf_counter() - started)
+    return summarize(durations)
+
+
+async def run_benchmarks(
+        database_url: str,
+        sizes: Iterable[int],
+        case_names: Optional[Iterable[str]] = None,
+        rounds: int = 50,
+        warmup: int = 5,
+        seed: int = 0,
+        log=print
+) -> dict:
+    """Seed a dataset of every size and time the cases against it.
+
+    Returns the JSON-ready report, results are keyed by dataset size and
+    case name.
+    """
+    case_names = list(case_names or CASES)
+    options = {"poolclass": NullPool} if database_url.startswith("sqlite") else {}
+    engine = create_async_engine(database_url, **options)
+    sessionmaker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "dialect": engine.dialect.name,
+        "python": platform.python_version(),
+        "seed": seed,
+        "results": {},
+    }
+    try:
+        for size in sizes:
+            log(f"Seeding {size} tasks ({engine.dialect.name})")
+            dataset = await seed_dataset(engine, size, seed)
+            context = BenchmarkContext(sessionmaker=sessionmaker, dataset=dataset)
+            results = report["results"][str(size)] = {}
+            for name in case_names:
+                results[name] = await run_case(name, context, rounds, warmup)
+                log(f"  {name:<34} median {results[name]['median']:>10.1f} us  p95 {results[name]['p95']:>10.1f} us")
+    finally:
+        await engine.dispose()
+    return report
+
+
+def find_regressions(baseline: dict, report: dict, threshold: float) -> List[str]:
+    """Cases whose median got slower than the baseline by more than ``threshold`` (0.2 = 20%)."""
+    regressions = []
+    for size, results in report["results"].items():
+        for name, stats in results.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous and stats["median"] > previous["median"] * (1 + threshold):
+                regressions.append(
+                    f"{name} @ {size} tasks: median {previous['median']:.1f} us -> {stats['median']:.1f} us"
+                )
+    return regressions
+
+
+def run(database_url: str, sizes: Iterable[int], **options) -> dict:
+    return asyncio.run(run_benchmarks(database_url, sizes, **options))
@@ -1,26 +1,223 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from settings import (
     POSTGRES_USER,
     POSTGRES_PASSWORD,
     DB_HOST,
     DB_PORT,
-    POSTGRES_DB
+    POSTGRES_DB,
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DATABASE_REPLICA_URLS,
+    DB_REPLICA_STICKINESS
 )
+from common.cache import TTLCache
+from monitoring.slow_queries import normalize_sql, slow_query_log
+from monitoring.tracing import current_span, record_span
+
+def empty_wait_stats() -> dict:
+    return {"checkouts": 0, "timeouts": 0, "wait_time_total": 0.0, "wait_time_max": 0.0}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Connection checkouts of this pool since start; wait times are in
+        # seconds and include opening a new connection and the pre-ping
+        self.wait_stats = empty_wait_stats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, keep counting where this one stopped
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_stats["checkouts"] += 1
+            self.wait_stats["wait_time_total"] += waited
+            self.wait_stats["wait_time_max"] = max(self.wait_stats["wait_time_max"], waited)
+
+
+def get_database_url() -> str:
+    if DATABASE_URL:
+        return DATABASE_URL
+    if DB_HOST:
+        return f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}"
+    # Refuse to start rather than write to some default database
+    raise RuntimeError("No database configured, set DB_HOST and the POSTGRES_* variables or DATABASE_URL")
+
+
+SQLALCHEMY_DATABASE_URL = get_database_url()
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # aiosqlite connections are bound to the event loop that opened them
+    engine_options = {"poolclass": NullPool}
+else:
+    engine_options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False, **engine_options)
+
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    duration: float = 0.0
+
+
+# Statements run on behalf of the current request, set by the metrics middleware
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
 
+def instrument_engine(async_engine):
+    """Count statements per request, trace them and log slow ones (see monitoring.slow_queries)."""
 
-SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        ended = time.perf_counter()
+        duration = ended - context.query_started
+        stats = request_query_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.duration += duration
+        if (slow_query_log.enabled and duration >= slow_query_log.threshold
+                and context.execution_options.get("slow_query_log", True)):
+            slow_query_log.record(async_engine, statement, parameters, executemany, duration)
+        if current_span.get() is not None:
+            record_span("db", context.query_started, ended, statement=normalize_sql(statement))
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+instrument_engine(engine)
+
+# Read-only routes use a replica session (marked in its info) when replicas are configured
+replica_engines = [create_async_engine(url, echo=False, **engine_options) for url in DATABASE_REPLICA_URLS]
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine)
+replica_sessions = [
+    async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False, info={"replica": True})
+    for replica_engine in replica_engines
+]
+
+# Ids of users who wrote recently, with any of their tokens; their reads stay
+# on the primary so they see their own changes despite replication lag
+recent_writers = TTLCache(maxsize=10000, ttl=DB_REPLICA_STICKINESS)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def get_pool_stats(async_engine=engine) -> dict:
+    """Current state of an engine's connection pool."""
+    pool = async_engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # Negative while the pool is still below pool_size
+            overflow=pool.overflow(),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT,
+        )
+    wait_stats = getattr(pool, "wait_stats", None) or empty_wait_stats()
+    checkouts = wait_stats["checkouts"]
+    stats.update(
+        wait_stats,
+        wait_time_avg=wait_stats["wait_time_total"] / checkouts if checkouts else 0.0
+    )
+    return stats
+
+
+def get_all_pool_stats() -> dict:
+    """Pool state of the primary and every replica engine, by engine name."""
+    engines = {"primary": engine}
+    engines.update((f"replica{index}", replica_engine) for index, replica_engine in enumerate(replica_engines, 1))
+    return {name: get_pool_stats(async_engine) for name, async_engine in engines.items()}
+
+
+def get_client_key(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+def get_cached_user(client_key: str):
+    """CurrentUser of a bearer token if get_current_user has cached it, else None."""
+    # Imported here, security.tokens imports this module
+    from security.tokens import token_cache
+    return token_cache.get(client_key)
+
+
+def _mark_committed(session, *args):
+    session.info["committed"] = True
+
+
+event.listen(Session, 'after_commit', _mark_committed)
+
+
+async def get_db(request: Request):
+    async with SessionLocal() as db:
+        yield db
+        client_key = get_client_key(request)
+        if client_key and db.info.get("committed"):
+            # Authenticated routes cached the user while checking the token
+            user = get_cached_user(client_key)
+            if user is not None:
+                recent_writers.set(user.id, True)
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Session for read-only routes.
+
+    Goes to a random replica, or to the primary (``get_db``) when there are
+    no replicas or the user wrote within the last DB_REPLICA_STICKINESS
+    seconds. Tokens not in the token cache yet also read from the primary,
+    their user is only known once get_current_user has looked them up.
+    """
+    use_primary = not replica_sessions
+    client_key = get_client_key(request)
+    if client_key and not use_primary:
+        user = get_cached_user(client_key)
+        use_primary = user is None or bool(recent_writers.get(user.id))
+    if use_primary:
         yield db
-    finally:
-        db.close()
+        return
+    async with random.choice(replica_sessions)() as replica_db:
+        yield replica_db
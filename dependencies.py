@@ -1,21 +1,23 @@
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from functools import wraps
 
-from accounts.models import User
+from accounts.schemas import CurrentUser
 from common.constants import PermissionName
 from database import get_db
 from accounts.routes import get_current_user
-from security.permissions import has_permission
+from security.permissions import get_user_permissions
+from monitoring.tracing import traced
 
 
 def permission_required(permission: PermissionName):
-    def dependency(
-            db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user)
+    @traced("permission_required")
+    async def dependency(
+            db: AsyncSession = Depends(get_db),
+            current_user: CurrentUser = Depends(get_current_user)
     ):
-        if not has_permission(current_user, permission, db):
+        if permission not in await get_user_permissions(current_user.id, db):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
@@ -23,3 +25,13 @@ def permission_required(permission: PermissionName):
         return True
 
     return dependency
+
+
+async def superuser_required(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """Restrict operational endpoints (monitoring, diagnostics) to super users."""
+    if not current_user.super_user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
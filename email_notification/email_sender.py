@@ -1,2 +1,6 @@
+from monitoring.tracing import traced
+
+
+@traced()
 def send_email(to_email: str, subject: str, body: str):
     print(f"Sending email to {to_email} with subject '{subject}' and body:\n{body}")
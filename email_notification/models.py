@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+
+from database import Base
+
+
+class OutboxMessage(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # NULL once the message is sent or has run out of attempts
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=True, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal
+from email_notification.email_sender import send_email
+from email_notification.models import OutboxMessage
+from monitoring.tracing import start_trace
+from settings import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_LEASE_TIME,
+    OUTBOX_RETRY_BACKOFF,
+    TRACING_ENABLED
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Messages handled by the worker of this process since start
+outbox_stats = {"sent": 0, "retried": 0, "failed": 0}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+async def get_queue_depth(db: AsyncSession) -> int:
+    """Messages not sent yet, including those leased by a worker."""
+    return (await db.execute(
+        select(func.count()).select_from(OutboxMessage).where(OutboxMessage.next_attempt_at.is_not(None))
+    )).scalar()
+
+
+async def claim_messages(batch_size: int) -> List[OutboxMessage]:
+    """Lease a batch of due messages by moving next_attempt_at past the send.
+
+    The lease is committed right away, so no lock or connection is held while
+    sending. Messages of a worker that dies mid-batch are sent again once
+    their lease runs out.
+    """
+    async with SessionLocal() as db:
+        now = datetime.utcnow()
+        messages = (await db.execute(
+            select(OutboxMessage)
+            .where(OutboxMessage.next_attempt_at <= now)
+            .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+            .limit(batch_size)
+            # Several workers can drain the same table without sending twice
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = now + timedelta(seconds=OUTBOX_LEASE_TIME)
+        await db.commit()
+    return messages
+
+
+async def record_result(message_id: int, **values):
+    async with SessionLocal() as db:
+        await db.execute(update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values))
+        await db.commit()
+
+
+async def drain_outbox(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Send one batch of due outbox messages and return its size."""
+    messages = await claim_messages(batch_size)
+
+    for message in messages:
+        try:
+            with start_trace("outbox_message", message_id=message.id) if TRACING_ENABLED else nullcontext():
+                await asyncio.to_thread(send_email, message.to_email, message.subject, message.body)
+        except Exception as exc:
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                next_attempt_at = None
+                outbox_stats["failed"] += 1
+                logger.error("Giving up on outbox message %s after %s attempts", message.id, message.attempts)
+            else:
+                next_attempt_at = datetime.utcnow() + retry_delay(message.attempts)
+                outbox_stats["retried"] += 1
+            await record_result(message.id, last_error=repr(exc), next_attempt_at=next_attempt_at)
+        else:
+            await record_result(message.id, sent_at=datetime.utcnow(), next_attempt_at=None)
+            outbox_stats["sent"] += 1
+
+    return len(messages)
+
+
+async def run_worker(stop_event: Optional[asyncio.Event] = None):
+    stop_event = stop_event or asyncio.Event()
+    while not stop_event.is_set():
+        try:
+            processed = await drain_outbox()
+        except Exception:
+            logger.exception("Failed to drain the email outbox")
+            processed = 0
+
+        # A full batch means more messages are probably waiting
+        if processed < OUTBOX_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
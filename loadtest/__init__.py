@@ -0,0 +1,4 @@
+"""Load generator driving the TaskFlow API with concurrent httpx clients.
+
+Run ``python -m loadtest --help``.
+"""
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from .runner import DEFAULT_MIX, parse_mix, run_load
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests in {report['elapsed']:.1f}s, {report['throughput']:.1f} req/s "
+          f"({report['target']}, concurrency {report['concurrency']})")
+    print(f"{'route':<36} {'req':>7} {'req/s':>8} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<36} {stats['requests']:>7} {stats['throughput']:>8.1f} {stats['error_rate'] * 100:>6.1f} "
+              f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load generator for the TaskFlow API.")
+    parser.add_argument("--base-url", help="URL of a running server, e.g. http://127.0.0.1:8000 "
+                                           "(default: drive the app in this process)")
+    parser.add_argument("--users", type=int, default=20, help="virtual users registered for the run")
+    parser.add_argument("--writers", type=int, default=5, help="virtual users given the manager role")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+                        help="scenario weights (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as error:
+        parser.error(str(error))
+
+    report = asyncio.run(run_load(
+        base_url=args.base_url,
+        users=args.users,
+        writers=args.writers,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        mix=mix,
+        seed=args.seed
+    ))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
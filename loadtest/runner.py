@@ -0,0 +1,170 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from sqlalchemy import select
+
+from .scenarios import LOADTEST_PASSWORD, SCENARIOS, WRITE_SCENARIOS, LoadState, VirtualUser
+
+DEFAULT_MIX = {"login": 1, "list": 20, "list_deep": 10, "get": 40, "create": 5, "update_status": 5, "delete": 2}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "list=20,get=40" into scenario weights."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, latency: float, status_code: Optional[int]):
+        self.latencies[route].append(latency)
+        self.statuses[route][str(status_code) if status_code else "error"] += 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            statuses = self.statuses[route]
+            errors = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 400)
+            routes[route] = {
+                "requests": len(latencies),
+                "throughput": len(latencies) / elapsed,
+                "error_rate": errors / len(latencies),
+                "statuses": dict(statuses),
+                # Milliseconds
+                "p50": percentile(latencies, 0.50) * 1000,
+                "p95": percentile(latencies, 0.95) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "max": latencies[-1] * 1000,
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {"elapsed": elapsed, "requests": total, "throughput": total / elapsed, "routes": routes}
+
+
+@asynccontextmanager
+async def open_client(base_url: Optional[str]) -> AsyncIterator[httpx.AsyncClient]:
+    """Client for a running server, or for the app in this process when no URL is given."""
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            yield client
+        return
+
+    from main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            yield client
+
+
+async def grant_write_roles(emails: List[str], writer_emails: List[str]) -> Dict[str, int]:
+    """Give the writers the manager role and return the ids of all users.
+
+    Registration only grants the read-only user role, so this goes straight
+    to the database configured in settings, which must be the server's.
+    """
+    from accounts.models import Role, User, UserRole
+    from common.constants import RoleName
+    from database import SessionLocal
+
+    async with SessionLocal() as db:
+        user_ids = dict((await db.execute(select(User.email, User.id).where(User.email.in_(emails)))).all())
+        if writer_emails:
+            manager = (await db.execute(select(Role).where(Role.name == RoleName.MANAGER))).scalars().one()
+            db.add_all(UserRole(user_id=user_ids[email], role_id=manager.id) for email in writer_emails)
+            await db.commit()
+    return user_ids
+
+
+async def provision(client: httpx.AsyncClient, user_count: int, writer_count: int) -> LoadState:
+    """Register the virtual users through /accounts/register."""
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"loadtest-{run_id}-{index}@example.com" for index in range(user_count)]
+    tokens = {}
+    for email in emails:
+        response = await client.post("/accounts/register", json={
+            "email": email, "password": LOADTEST_PASSWORD, "first_name": "Load", "last_name": "Test"
+        })
+        response.raise_for_status()
+        tokens[email] = response.json()["token"]
+
+    writers = emails[:writer_count]
+    user_ids = await grant_write_roles(emails, writers)
+    users = [
+        VirtualUser(id=user_ids[email], email=email, token=tokens[email], writer=email in writers)
+        for email in emails
+    ]
+
+    response = await client.get("/taskboard/tasks", params={"page_size": 100})
+    response.raise_for_status()
+    return LoadState(
+        users=users,
+        task_ids=[task["id"] for task in response.json()],
+        total_tasks=int(response.headers.get("X-Total-Count", 0))
+    )
+
+
+async def worker(client, state: LoadState, mix: Dict[str, float], stats: RouteStats, deadline: float, rng: random.Random):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        candidates = state.writers() if name in WRITE_SCENARIOS else state.users
+        user = rng.choice(candidates or state.users)
+        started = time.perf_counter()
+        try:
+            route, response = await SCENARIOS[name](client, state, user, rng)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            route, status_code = name, None
+        stats.record(route, time.perf_counter() - started, status_code)
+
+
+async def run_load(
+        base_url: Optional[str] = None,
+        users: int = 20,
+        writers: int = 5,
+        concurrency: int = 20,
+        duration: float = 30,
+        mix: Optional[Dict[str, float]] = None,
+        seed: int = 0
+) -> dict:
+    mix = mix or DEFAULT_MIX
+    async with open_client(base_url) as client:
+        state = await provision(client, users, min(writers, users))
+        stats = RouteStats()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            worker(client, state, mix, stats, deadline, random.Random(seed + index))
+            for index in range(concurrency)
+        ])
+        report = stats.report(time.perf_counter() - started)
+    report.update(
+        target=base_url or "in-process",
+        users=users,
+        writers=min(writers, users),
+        concurrency=concurrency,
+        mix=mix
+    )
+    return report
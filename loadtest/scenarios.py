@@ -0,0 +1,120 @@
+"""Request scenarios of the load generator.
+
+A scenario sends one request and returns the route template it hit (used
+to group the statistics) and the response.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+from common.constants import TaskStatus
+
+LOADTEST_PASSWORD = "loadtest-password"
+LIST_PAGE_SIZE = 20
+
+
+@dataclass
+class VirtualUser:
+    id: int
+    email: str
+    token: str
+    writer: bool
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+@dataclass
+class LoadState:
+    """Shared by all workers: the provisioned users and the known tasks."""
+    users: List[VirtualUser]
+    task_ids: List[int]
+    total_tasks: int = 0
+    created_task_ids: List[int] = field(default_factory=list)
+
+    def writers(self) -> List[VirtualUser]:
+        return [user for user in self.users if user.writer]
+
+
+Scenario = Callable[[httpx.AsyncClient, LoadState, VirtualUser, random.Random], Awaitable[Tuple[str, httpx.Response]]]
+
+SCENARIOS: Dict[str, Scenario] = {}
+# Scenarios that need the create/update/delete permissions
+WRITE_SCENARIOS = {"create", "update_status", "delete"}
+
+
+def scenario(name: str):
+    def register(function):
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+@scenario("login")
+async def login(client, state, user, rng):
+    response = await client.post("/accounts/login", json={"email": user.email, "password": LOADTEST_PASSWORD})
+    return "POST /accounts/login", response
+
+
+@scenario("list")
+async def list_first_page(client, state, user, rng):
+    response = await client.get("/taskboard/tasks", params={"page_size": LIST_PAGE_SIZE})
+    if response.status_code == 200:
+        state.total_tasks = int(response.headers.get("X-Total-Count", state.total_tasks))
+    return "GET /taskboard/tasks", response
+
+
+@scenario("list_deep")
+async def list_deep_page(client, state, user, rng):
+    last_page = max(1, (state.total_tasks + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE)
+    page = rng.randint(1, last_page)
+    response = await client.get("/taskboard/tasks", params={"page": page, "page_size": LIST_PAGE_SIZE})
+    return "GET /taskboard/tasks?page=N", response
+
+
+@scenario("get")
+async def get_task(client, state, user, rng):
+    task_id = rng.choice(state.task_ids) if state.task_ids else 0
+    response = await client.get(f"/taskboard/tasks/{task_id}", headers=user.headers)
+    return "GET /taskboard/tasks/{task_id}", response
+
+
+@scenario("create")
+async def create_task(client, state, user, rng):
+    responsible = rng.choice(state.users)
+    response = await client.post("/taskboard/tasks", headers=user.headers, json={
+        "title": f"Load test task {rng.randrange(1_000_000)}",
+        "description": "Created by the load generator",
+        "responsible_id": responsible.id,
+        "executor_ids": [executor.id for executor in rng.sample(state.users, min(2, len(state.users)))],
+    })
+    if response.status_code == 200:
+        task_id = response.json()["id"]
+        state.task_ids.append(task_id)
+        state.created_task_ids.append(task_id)
+    return "POST /taskboard/tasks", response
+
+
+@scenario("update_status")
+async def update_status(client, state, user, rng):
+    task_id = rng.choice(state.task_ids) if state.task_ids else 0
+    response = await client.put(
+        f"/taskboard/tasks/{task_id}", headers=user.headers, json={"status": rng.choice(list(TaskStatus)).value}
+    )
+    return "PUT /taskboard/tasks/{task_id}", response
+
+
+@scenario("delete")
+async def delete_task(client, state, user, rng):
+    # Only tasks created by this run are deleted
+    if state.created_task_ids:
+        task_id = state.created_task_ids.pop(rng.randrange(len(state.created_task_ids)))
+        if task_id in state.task_ids:
+            state.task_ids.remove(task_id)
+    else:
+        task_id = 0
+    response = await client.delete(f"/taskboard/tasks/{task_id}", headers=user.headers)
+    return "DELETE /taskboard/tasks/{task_id}", response
@@ -1,14 +1,29 @@
+import asyncio
 import logging
+
+from anyio import to_thread
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
-from sqlalchemy.orm import Session
-
-from database import engine, Base
+from database import Base, SessionLocal, engine
+from email_notification.worker import run_worker
 from accounts.routes import router as accounts_router
 from scripts.initialize_permissions import initialize_permissions
+from security.tokens import run_token_purge
 from taskboard.routes import router as tasks_router
-from database import get_db
+from monitoring.metrics import MetricsMiddleware
+from monitoring.profiling import ProfilingMiddleware
+from monitoring.tracing import TracingMiddleware, trace_exporter
+from monitoring.slow_queries import RequestScopeMiddleware
+from monitoring.routes import metrics_router, router as monitoring_router
+from settings import (
+    METRICS_ENABLED,
+    OUTBOX_WORKER_ENABLED,
+    PROFILING_ENABLED,
+    THREADPOOL_SIZE,
+    TOKEN_PURGE_ENABLED,
+    TRACING_ENABLED
+)
 
 
 logging.getLogger('passlib').setLevel(logging.ERROR)
@@ -17,16 +32,47 @@ logging.getLogger('passlib').setLevel(logging.ERROR)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # logic when starting app
-    db: Session = next(get_db())
-    initialize_permissions(db)
+    # Sync routes run in this threadpool, keep it in line with the DB pool
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+    if engine.dialect.name == "sqlite":
+        # Migrations only target PostgreSQL, SQLite databases get their schema from the models
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        await db.run_sync(initialize_permissions)
+
+    # Sends queued status-change emails, can also run as `python -m email_notification.worker`
+    stop_worker = asyncio.Event()
+    worker = asyncio.create_task(run_worker(stop_worker)) if OUTBOX_WORKER_ENABLED else None
+    # Deletes expired tokens, can also run as `python -m scripts.purge_tokens`
+    token_purge = asyncio.create_task(run_token_purge(stop_worker)) if TOKEN_PURGE_ENABLED else None
     yield
     # Here we can add logic to terminate the application (if required)
+    stop_worker.set()
+    for task in (worker, token_purge):
+        if task:
+            await task
+    if trace_exporter is not None:
+        await asyncio.to_thread(trace_exporter.flush)
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Route of the current request for the slow-query log
+app.add_middleware(RequestScopeMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 app.include_router(accounts_router, prefix='/accounts')
 app.include_router(tasks_router, prefix='/taskboard')
+app.include_router(monitoring_router, prefix='/monitoring')
 
 
 @app.get("/")
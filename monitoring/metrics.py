@@ -0,0 +1,262 @@
+"""Minimal Prometheus metrics: counters, histograms and gauges in text format.
+
+Label values must come from a bounded set (route templates, methods,
+status codes), every distinct combination is kept in memory.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from database import QueryStats, get_all_pool_stats, request_query_stats
+from email_notification.worker import outbox_stats
+from monitoring.slow_queries import route_template
+from security.permissions import permission_cache
+from security.tokens import token_cache
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return self.header() + self.samples()
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets: Iterable[float] = ()):
+        super().__init__(name, documentation, label_names)
+        self.buckets = sorted(buckets)
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            items = sorted((labels, (counts[:], total[0])) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class GaugeCollector(Metric):
+    """Gauge read from a callback at scrape time, returning {label values: value}."""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, label_names, collect: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, label_names)
+        self.collect = collect
+
+    def samples(self):
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class CounterCollector(GaugeCollector):
+    """Counter kept elsewhere (e.g. TTLCache.hits), read at scrape time."""
+    type_name = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Other request methods share the "other" label, clients can send any string
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+http_requests_total = registry.register(Counter(
+    "taskflow_http_requests_total", "HTTP requests by route template and status code.",
+    ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "taskflow_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route"), LATENCY_BUCKETS
+))
+db_queries_per_request = registry.register(Histogram(
+    "taskflow_db_queries_per_request", "Database statements executed per HTTP request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS
+))
+db_time_per_request_seconds = registry.register(Histogram(
+    "taskflow_db_time_per_request_seconds", "Time spent in database statements per HTTP request.",
+    ("method", "route"), LATENCY_BUCKETS
+))
+
+
+def _cache_stats():
+    return {"token": token_cache.stats(), "permission": permission_cache.stats()}
+
+
+cache_hits_total = registry.register(CounterCollector(
+    "taskflow_cache_hits_total", "In-process cache hits.", ("cache",),
+    lambda: {(name,): stats["hits"] for name, stats in _cache_stats().items()}
+))
+cache_misses_total = registry.register(CounterCollector(
+    "taskflow_cache_misses_total", "In-process cache misses.", ("cache",),
+    lambda: {(name,): stats["misses"] for name, stats in _cache_stats().items()}
+))
+cache_size = registry.register(GaugeCollector(
+    "taskflow_cache_size", "Entries in the in-process caches.", ("cache",),
+    lambda: {(name,): stats["size"] for name, stats in _cache_stats().items()}
+))
+
+
+def _outbox_stats():
+    return {(key,): value for key, value in outbox_stats.items()}
+
+
+def _pool_stats():
+    return {
+        (engine_name, key): value
+        for engine_name, stats in get_all_pool_stats().items()
+        for key, value in stats.items() if isinstance(value, (int, float))
+    }
+
+
+outbox = registry.register(CounterCollector(
+    "taskflow_outbox", "Email outbox messages handled by the worker of this process.", ("stat",), _outbox_stats
+))
+# Set from the outbox table on every scrape, the worker may run in another process
+outbox_queue_depth = registry.register(Gauge(
+    "taskflow_outbox_queue_depth", "Email outbox messages not sent yet."
+))
+db_pool = registry.register(GaugeCollector(
+    "taskflow_db_pool", "Database connection pool state per engine, see /monitoring/db-pool.", ("engine", "stat"),
+    _pool_stats
+))
+
+
+class MetricsMiddleware:
+    """Records latency, status code and database statements of each HTTP request.
+
+    Requests are labelled with the matched route template (``/taskboard/tasks/{task_id}``),
+    never the raw path, unmatched paths share the "unmatched" label and
+    non-standard methods the "other" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_stats = QueryStats()
+        reset_token = request_query_stats.set(query_stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            request_query_stats.reset(reset_token)
+            route_label = route_template(scope) or "unmatched"
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+            http_requests_total.inc(method, route_label, str(status_code))
+            http_request_duration_seconds.observe(duration, method, route_label)
+            db_queries_per_request.observe(query_stats.queries, method, route_label)
+            db_time_per_request_seconds.observe(query_stats.duration, method, route_label)
@@ -0,0 +1,85 @@
+"""On-demand profiling of single requests.
+
+A super user sends ``X-Profile: 1`` and the request runs under cProfile. The
+stats are written to PROFILING_DIR as ``<id>.prof`` (load with pstats or
+snakeviz) with a ``<id>.txt`` summary, and the id is returned in the
+``X-Profile-Id`` response header.
+
+cProfile follows the event loop thread, so coroutines of other requests
+running at the same time show up in the profile too. Only one request per
+process is profiled at a time, further ones run without the profiler.
+"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+
+from accounts.routes import get_current_user
+from database import SessionLocal, get_client_key
+from settings import PROFILING_DIR
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+SUMMARY_LINES = 40
+
+
+async def is_super_user(token: str) -> bool:
+    async with SessionLocal() as db:
+        try:
+            user = await get_current_user(token, db)
+        except HTTPException:
+            return False
+    return user.super_user
+
+
+def write_profile(profiler: cProfile.Profile, directory: str, profile_id: str, request_line: str):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, profile_id)
+    profiler.dump_stats(f"{path}.prof")
+    summary = io.StringIO()
+    summary.write(f"{request_line}\n\n")
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    with open(f"{path}.txt", "w") as summary_file:
+        summary_file.write(summary.getvalue())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, directory: str = PROFILING_DIR):
+        self.app = app
+        self.directory = directory
+        self.busy = False
+
+    async def should_profile(self, scope) -> bool:
+        request = Request(scope)
+        if request.headers.get(PROFILE_HEADER) not in ("1", "true"):
+            return False
+        token = get_client_key(request)
+        return bool(token) and await is_super_user(token) and not self.busy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        self.busy = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self.busy = False
+            request_line = f"{scope['method']} {scope['path']}"
+            await asyncio.to_thread(write_profile, profiler, self.directory, profile_id, request_line)
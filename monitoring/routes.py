@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_all_pool_stats, get_db
+from dependencies import superuser_required
+from email_notification.worker import get_queue_depth
+from monitoring.metrics import outbox_queue_depth, registry
+from monitoring.tracing import get_trace, recent_traces
+
+router = APIRouter(dependencies=[Depends(superuser_required)])
+
+# Scraped by Prometheus, which has no user token
+metrics_router = APIRouter()
+
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """Pool state of the primary (``primary``) and each replica (``replica1``, ...)."""
+    return get_all_pool_stats()
+
+
+@router.get("/traces")
+async def list_traces(limit: int = Query(20, ge=1, le=200)):
+    """Most recent finished traces first."""
+    return [trace.to_dict() for trace in list(recent_traces)[::-1][:limit]]
+
+
+@router.get("/traces/{trace_id}")
+async def trace_detail(trace_id: str):
+    trace = get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics(db: AsyncSession = Depends(get_db)):
+    outbox_queue_depth.set(await get_queue_depth(db))
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,130 @@
+"""Slow-query log: statements over SLOW_QUERY_THRESHOLD with their plan.
+
+The plan comes from ``EXPLAIN`` on PostgreSQL (the statement is planned, not
+run) and ``EXPLAIN QUERY PLAN`` on SQLite. It is captured in a background
+task on a separate connection, at most once per SLOW_QUERY_EXPLAIN_INTERVAL
+for the same normalized statement.
+"""
+import asyncio
+import logging
+import re
+from contextvars import ContextVar
+from typing import Optional
+
+from common.cache import TTLCache
+from settings import SLOW_QUERY_LOG_ENABLED, SLOW_QUERY_THRESHOLD, SLOW_QUERY_EXPLAIN_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# ASGI scope of the current request, set by RequestScopeMiddleware
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+# Statements EXPLAIN accepts without side effects
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+def route_template(scope: Optional[dict]) -> Optional[str]:
+    """Path of the matched route (``/taskboard/tasks/{task_id}``), None before routing."""
+    return getattr((scope or {}).get("route"), "path", None)
+
+
+class RequestScopeMiddleware:
+    """Tells the slow-query log which request a statement runs for."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        reset_token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope.reset(reset_token)
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement text with literals and placeholders as ``?`` and IN lists folded."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?, ...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Types of the bound parameters without their values, e.g. ``(int, str)``."""
+    if executemany:
+        parameters = list(parameters or ())
+        return f"{len(parameters)} x {parameter_shape(parameters[0]) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+class SlowQueryLog:
+    def __init__(self, enabled: bool, threshold: float, explain_interval: float):
+        self.enabled = enabled
+        self.threshold = threshold
+        # Normalized statements explained recently
+        self.recently_explained = TTLCache(maxsize=1000, ttl=explain_interval)
+        self._explain_tasks = set()
+
+    def record(self, async_engine, statement: str, parameters, executemany: bool, duration: float):
+        normalized = normalize_sql(statement)
+        entry = {
+            "duration_ms": round(duration * 1000, 1),
+            "route": route_template(request_scope.get()),
+            "statement": normalized,
+            "parameters": parameter_shape(parameters, executemany),
+        }
+        if executemany or not self._should_explain(normalized):
+            self.log(entry)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.log(entry)
+            return
+        task = loop.create_task(self.explain(async_engine, statement, parameters, entry))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    def _should_explain(self, normalized: str) -> bool:
+        if not normalized.lower().startswith(_EXPLAINABLE):
+            return False
+        if self.recently_explained.get(normalized):
+            return False
+        self.recently_explained.set(normalized, True)
+        return True
+
+    async def explain(self, async_engine, statement: str, parameters, entry: dict):
+        sqlite = async_engine.dialect.name == "sqlite"
+        prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+        try:
+            async with async_engine.connect() as connection:
+                rows = (await connection.exec_driver_sql(
+                    prefix + statement, parameters, execution_options={"slow_query_log": False}
+                )).all()
+        except Exception as error:
+            entry["plan"] = f"not available: {error}"
+        else:
+            # SQLite returns (id, parent, notused, detail), PostgreSQL one line per row
+            entry["plan"] = "\n".join(str(row[-1]) for row in rows)
+        self.log(entry)
+
+    def log(self, entry: dict):
+        message = "Slow query (%s ms) on %s: %s; parameters %s"
+        args = [entry["duration_ms"], entry["route"] or "-", entry["statement"], entry["parameters"]]
+        if "plan" in entry:
+            message += "\n%s"
+            args.append(entry["plan"])
+        logger.warning(message, *args, extra={"slow_query": entry})
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_LOG_ENABLED, SLOW_QUERY_THRESHOLD, SLOW_QUERY_EXPLAIN_INTERVAL)
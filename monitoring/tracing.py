@@ -0,0 +1,257 @@
+"""Lightweight in-process tracing.
+
+TracingMiddleware opens a trace per sampled HTTP request, continuing the
+caller's W3C ``traceparent`` when one is sent. Code inside the request adds
+spans with ``span()`` or ``@traced()``, database statements are added by the
+engine hooks in database.py. Outside a trace both are close to free.
+
+Finished traces are kept in a ring buffer of TRACING_BUFFER_SIZE traces
+(``GET /monitoring/traces``) and appended to TRACING_EXPORT_PATH as JSON
+lines by a background thread when it is set.
+"""
+import asyncio
+import functools
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, List, Optional
+
+import orjson
+from starlette.requests import Request
+
+from settings import TRACING_SAMPLE_RATE, TRACING_BUFFER_SIZE, TRACING_EXPORT_PATH
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(value: Optional[str]):
+    """(trace id, parent span id, sampled) of a traceparent header, None if it is invalid."""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+
+    def to_dict(self) -> dict:
+        spans = sorted(self.spans, key=lambda span: span.started)
+        return {"trace_id": self.trace_id, "spans": [span.to_dict() for span in spans]}
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: dict, started: float = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.started = time.perf_counter() if started is None else started
+        # Wall clock start, perf_counter is only good for durations
+        self.start_time = time.time() - (time.perf_counter() - self.started)
+        self.duration: Optional[float] = None
+
+    def end(self, ended: float = None):
+        self.duration = (time.perf_counter() if ended is None else ended) - self.started
+        self.trace.spans.append(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+recent_traces: Deque[Trace] = deque(maxlen=TRACING_BUFFER_SIZE)
+
+
+class TraceExporter:
+    """Appends finished traces to a JSON-lines file from a background thread.
+
+    Serializing and writing stay off the event loop. When the file cannot
+    keep up and ``max_queued`` traces are waiting, further ones are dropped
+    and counted in ``dropped``.
+    """
+
+    def __init__(self, path: str, max_queued: int = 10000):
+        self.path = path
+        self.queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queued)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued trace is written."""
+        self.queue.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            traces = [self.queue.get()]
+            # Write whatever queued up meanwhile in one go
+            while True:
+                try:
+                    traces.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "ab") as export_file:
+                    export_file.writelines(orjson.dumps(trace.to_dict()) + b"\n" for trace in traces)
+            except OSError:
+                logger.exception("Failed to export %s traces to %s", len(traces), self.path)
+            for _ in traces:
+                self.queue.task_done()
+
+
+trace_exporter = TraceExporter(TRACING_EXPORT_PATH) if TRACING_EXPORT_PATH else None
+
+
+def export_trace(trace: Trace):
+    recent_traces.append(trace)
+    if trace_exporter is not None:
+        trace_exporter.export(trace)
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    return next((trace for trace in reversed(recent_traces) if trace.trace_id == trace_id), None)
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """Root span of a new trace, a child of the remote parent in ``traceparent``."""
+    parent = parse_traceparent(traceparent)
+    trace = Trace(parent[0] if parent else new_trace_id())
+    root = Span(trace, name, parent[1] if parent else None, attributes)
+    reset_token = current_span.set(root)
+    try:
+        yield root
+    except Exception as error:
+        root.attributes["error"] = repr(error)
+        raise
+    finally:
+        current_span.reset(reset_token)
+        root.end()
+        export_trace(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current one, does nothing outside a trace."""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    reset_token = current_span.set(child)
+    try:
+        yield child
+    except Exception as error:
+        child.attributes["error"] = repr(error)
+        raise
+    finally:
+        current_span.reset(reset_token)
+        child.end()
+
+
+def record_span(name: str, started: float, ended: float, **attributes):
+    """Add a finished span timed with perf_counter, e.g. from event hooks."""
+    parent = current_span.get()
+    if parent is not None:
+        Span(parent.trace, name, parent.span_id, attributes, started=started).end(ended)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running a sync or async function inside a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    def __init__(self, app, sample_rate: float = TRACING_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = Request(scope).headers.get("traceparent")
+        parent = parse_traceparent(traceparent)
+        sampled = parent[2] if parent else random.random() < self.sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        with start_trace(f"{scope['method']} {scope['path']}", traceparent, method=scope["method"]) as root:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.attributes["status"] = message["status"]
+                    message["headers"] = [*message.get("headers", []), (b"traceparent", root.traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name the trace after the route template once it is matched
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
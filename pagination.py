@@ -1,9 +1,14 @@
-from typing import Optional, List
-from fastapi import Query, Request, Depends
-from sqlalchemy import select, desc, asc, func
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Optional, List, Tuple
+from fastapi import Query, Request, Depends, HTTPException, status
+from sqlalchemy import select, desc, asc, func, and_, or_, text, Table
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_read_db
+from settings import PAGINATION_EXACT_COUNT_THRESHOLD
 from taskboard.schemas import TaskOut
 
 
@@ -11,32 +16,276 @@ def paginate_query(query, page: int = 1, page_size: int = 10):
     offset = (page - 1) * page_size
     return query.offset(offset).limit(page_size)
 
+
+def encode_cursor(order_by: Optional[str], values: list) -> str:
+    payload = json.dumps({"o": order_by or "", "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: Optional[str]) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_order_by, values = payload["o"], payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if cursor_order_by != (order_by or "") or not isinstance(values, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested ordering"
+        )
+    return values
+
+
+def dump_cursor_value(value):
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def load_cursor_value(column, value):
+    """Convert a decoded cursor value back to the column's Python type.
+
+    Values that do not fit the column raise ValueError or TypeError, so a
+    tampered cursor never reaches the database as a mismatched parameter.
+    """
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    if python_type is None or not isinstance(python_type, type):
+        if isinstance(value, (str, int, float)):
+            return value
+        raise TypeError(f"Unsupported cursor value: {value!r}")
+    if issubclass(python_type, Enum):
+        return python_type[value]
+    if issubclass(python_type, datetime):
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) and python_type is not bool:
+        raise TypeError(f"Unsupported cursor value: {value!r}")
+    if isinstance(value, python_type):
+        return value
+    # JSON has a single number type, numbers and numeric strings convert when nothing is lost
+    if python_type is int and (isinstance(value, str) or isinstance(value, float) and value.is_integer()):
+        return int(value)
+    if python_type is float and isinstance(value, (int, str)):
+        return float(value)
+    if python_type is str and isinstance(value, (int, float)):
+        return str(value)
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
 class Paginator:
-    def __init__(self, db: Session, request: Request):
+    def __init__(self, db: AsyncSession, request: Request):
         self.db = db
         self.request = request
+        self.next_cursor: Optional[str] = None
+        self.total_is_estimate = False
+
+    @staticmethod
+    def filter_query(query, **filters):
+        """Restrict ``query`` to rows whose columns match ``filters``.
 
-    def paginate(self, query, order_by: Optional[str] = None, page: int = 1, page_size: int = 10):
-        total_records = self.db.execute(select(func.count()).select_from(query.subquery())).scalar()
-        if order_by:
-            if order_by.startswith("-"):
-                field = order_by[1:]
-                query = query.order_by(desc(field))
+        A list value becomes an IN condition, None or an empty list is ignored.
+        """
+        columns = query.selected_columns
+        for field, value in filters.items():
+            if value is None or value == []:
+                continue
+            column = columns.get(field)
+            if column is None:
+                raise ValueError(f"Invalid field for filtering: {field}")
+            if isinstance(value, (list, tuple, set)):
+                query = query.where(column.in_(value))
             else:
-                field = order_by
-                query = query.order_by(asc(field))
+                query = query.where(column == value)
+        return query
 
-            if not field in query.columns:
+    @staticmethod
+    def get_ordering(query, order_by: Optional[str]) -> List[Tuple[object, bool]]:
+        """Parse ``order_by`` ("status,-title") into (column, descending) pairs.
+
+        The ``id`` column is appended as a tiebreaker so that the ordering is
+        total, which both offset and cursor pagination rely on.
+        """
+        columns = query.selected_columns
+        ordering = []
+        for item in order_by.split(",") if order_by else []:
+            item = item.strip()
+            descending = item.startswith("-")
+            field = item[1:] if descending else item
+            column = columns.get(field)
+            if column is None:
                 raise ValueError(f"Invalid field for ordering: {field}")
+            ordering.append((column, descending))
+
+        tiebreaker = columns.get("id")
+        if tiebreaker is not None and all(column.key != "id" for column, _ in ordering):
+            ordering.append((tiebreaker, False))
+        return ordering
+
+    @staticmethod
+    def order_clause(column, descending: bool):
+        clause = desc(column) if descending else asc(column)
+        # Same NULL placement on every backend, the keyset filter relies on it
+        if getattr(column, "nullable", True):
+            clause = clause.nulls_last()
+        return clause
+
+    @staticmethod
+    def row_value(row, column):
+        # Extra labelled columns live on the row, mapped ones on its entity
+        mapping = row._mapping
+        if column.key in mapping:
+            return mapping[column.key]
+        return getattr(row[0], column.key)
+
+    @staticmethod
+    def keyset_condition(ordering: List[Tuple[object, bool]], values: list):
+        """Build the WHERE clause selecting rows that sort after ``values``."""
+        conditions = []
+        for index, (column, descending) in enumerate(ordering):
+            value = values[index]
+            if value is None:
+                # NULLs sort last, nothing comes after them in this column
+                continue
+            after = column < value if descending else column > value
+            if getattr(column, "nullable", True):
+                after = or_(after, column.is_(None))
+            equal = [
+                prev_column.is_(None) if prev_value is None else prev_column == prev_value
+                for (prev_column, _), prev_value in zip(ordering[:index], values[:index])
+            ]
+            conditions.append(and_(*equal, after))
+        return or_(*conditions)
+
+    async def count(self, query) -> int:
+        return (await self.db.execute(select(func.count()).select_from(query.subquery()))).scalar()
+
+    async def estimate_count(self, query) -> Optional[int]:
+        """Row count of an unfiltered single-table query from table statistics.
+
+        Returns None when the query is filtered or the backend has no
+        statistics for the table yet.
+        """
+        froms = query.get_final_froms()
+        if query.whereclause is not None or len(froms) != 1 or not isinstance(froms[0], Table):
+            return None
+
+        table_name = froms[0].name
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            estimate = (await self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+                {"name": table_name}
+            )).scalar()
+        elif dialect == "sqlite":
+            has_stats = (await self.db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            )).scalar()
+            if not has_stats:
+                return None
+            stat = (await self.db.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :name LIMIT 1"),
+                {"name": table_name}
+            )).scalar()
+            estimate = int(stat.split()[0]) if stat else None
+        else:
+            return None
+
+        # reltuples is -1 for tables that were never analyzed
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
+
+    async def paginate(
+            self,
+            query,
+            order_by: Optional[str] = None,
+            page: int = 1,
+            page_size: int = 10,
+            cursor: Optional[str] = None,
+            include_total: Optional[bool] = None,
+            estimate_total: bool = False
+    ):
+        """Return one page of ``query`` and the total number of records.
+
+        The exact total is computed with a window count in the page query
+        itself. With ``estimate_total`` large tables report the planner's row
+        estimate instead (see ``total_is_estimate``), and without
+        ``include_total`` the total is None and no count is run at all.
+
+        ``include_total`` defaults to True for offset pages and False for
+        cursor pages: a keyset page cannot use the window count, its total
+        takes a separate count over the whole result set.
+        """
+        if include_total is None:
+            include_total = not cursor
+        total_records = None
+        self.total_is_estimate = False
+        if include_total and estimate_total:
+            estimate = await self.estimate_count(query)
+            if estimate is not None and estimate >= PAGINATION_EXACT_COUNT_THRESHOLD:
+                total_records = estimate
+                self.total_is_estimate = True
+
+        ordering = self.get_ordering(query, order_by)
+        page_query = query.order_by(*[self.order_clause(column, descending) for column, descending in ordering])
+
+        if cursor:
+            values = decode_cursor(cursor, order_by)
+            if len(values) != len(ordering):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            try:
+                values = [load_cursor_value(column, value) for (column, _), value in zip(ordering, values)]
+            except (KeyError, ValueError, TypeError):
+                # Unknown enum name, malformed date or wrong type in a tampered cursor
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            page_query = page_query.where(self.keyset_condition(ordering, values))
+        else:
+            page_query = paginate_query(page_query, page, page_size)
+        # Fetch one extra row to know whether another page follows
+        page_query = page_query.limit(page_size + 1)
+
+        # A window count only sees the whole result set without a keyset filter
+        window_count = include_total and total_records is None and not cursor
+        if window_count:
+            page_query = page_query.add_columns(func.count().over().label("total_count"))
+
+        rows = (await self.db.execute(page_query)).all()
+        if window_count:
+            if rows:
+                total_records = rows[0].total_count
+            elif page == 1:
+                total_records = 0
+        if include_total and total_records is None:
+            total_records = await self.count(query)
+
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        # ORM entity queries yield the entities, column queries the rows themselves
+        first_column = query.column_descriptions[0]
+        if first_column["expr"] is first_column["entity"]:
+            result = [row[0] for row in rows]
+        else:
+            result = rows
 
-        query = paginate_query(query, page, page_size)
-        result = self.db.execute(query).scalars().all()
+        self.next_cursor = None
+        if has_next and rows:
+            self.next_cursor = encode_cursor(
+                order_by,
+                [dump_cursor_value(self.row_value(rows[-1], column)) for column, _ in ordering]
+            )
 
         return result, total_records
 
 
 def get_paginator(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Paginator:
     return Paginator(db=db, request=request)
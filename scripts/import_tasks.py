@@ -0,0 +1,41 @@
+"""Import tasks from a CSV or NDJSON file.
+
+Usage: python -m scripts.import_tasks tasks.csv [--format csv|ndjson]
+
+The format defaults to the file extension. Rejected rows are printed with
+their row numbers, the exit status is 1 if there were any.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from database import SessionLocal
+from taskboard.importer import IMPORT_FORMATS, import_tasks
+
+
+async def run_import(path: Path, import_format: str):
+    with path.open(encoding="utf-8-sig", newline="") as lines:
+        async with SessionLocal() as db:
+            return await import_tasks(db, lines, import_format)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import tasks from a CSV or NDJSON file.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", dest="import_format", choices=IMPORT_FORMATS)
+    args = parser.parse_args(argv)
+
+    import_format = args.import_format or args.path.suffix.lstrip(".").lower()
+    if import_format not in IMPORT_FORMATS:
+        parser.error("cannot tell the format from the file name, pass --format")
+
+    result = asyncio.run(run_import(args.path, import_format))
+    for error in result.errors:
+        print(f"row {error.row}: {error.detail}", file=sys.stderr)
+    print(f"Imported {result.imported} tasks, rejected {len(result.errors)} rows")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from accounts.models import Permission, Role, RolePermission
 from common.constants import PermissionName, RoleName
+from security.permissions import invalidate_permission_cache
 
 
 
@@ -38,6 +39,9 @@ def initialize_permissions(db: Session):
     # Commit all changes to the database
     db.commit()
 
+    # Role permissions may have changed, drop the cached ones
+    invalidate_permission_cache()
+
 
 def get_or_create_roles(db: Session, required_roles: list) -> Dict[
     RoleName, Role]:
@@ -0,0 +1,32 @@
+"""Delete expired bearer tokens.
+
+Usage: python -m scripts.purge_tokens [--batch-size 1000]
+
+Tokens issued more than TOKEN_TTL seconds ago are deleted in batches, each
+in its own transaction. The app does the same every TOKEN_PURGE_INTERVAL
+seconds unless TOKEN_PURGE_ENABLED is false.
+"""
+import argparse
+import asyncio
+
+from database import SessionLocal
+from security.tokens import purge_expired_tokens
+from settings import TOKEN_PURGE_BATCH_SIZE
+
+
+async def run_purge(batch_size: int) -> int:
+    async with SessionLocal() as db:
+        return await purge_expired_tokens(db, batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete expired bearer tokens.")
+    parser.add_argument("--batch-size", type=int, default=TOKEN_PURGE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    purged = asyncio.run(run_purge(args.batch_size))
+    print(f"Deleted {purged} expired tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Fill the database with generated users, roles and tasks.
+
+Usage: python -m scripts.seed_data --users 10000 --tasks 1000000 [--seed 0]
+
+Rows are written in bulk (COPY on PostgreSQL) with explicit ids. All users
+share one precomputed password hash (SEED_PASSWORD). The same seed on an
+empty database produces the same data.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from itertools import accumulate
+from typing import List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from accounts.models import Role, User, UserRole
+from common.constants import RoleName, TaskPriority, TaskStatus
+from scripts.initialize_permissions import initialize_permissions
+from security.passwords import get_password_hash
+from taskboard.importer import copy_records, use_copy
+from taskboard.models import Task, TaskExecutors
+from taskboard.versioning import mark_tasks_changed
+
+SEED_PASSWORD = "password123"
+CHUNK_SIZE = 50000
+
+VERBS = "Fix Add Review Update Remove Design Test Deploy Document Refactor Investigate Migrate".split()
+NOUNS = (
+    "login page, search, export, import, dashboard, email templates, permissions, cache, "
+    "release notes, database indexes, API docs, onboarding flow, billing, reports, backups"
+).split(", ")
+
+# Share of tasks with 0, 1, 2, ... executors
+EXECUTOR_COUNT_WEIGHTS = [25, 40, 20, 10, 3, 2]
+STATUS_WEIGHTS = {TaskStatus.TODO: 50, TaskStatus.IN_PROGRESS: 20, TaskStatus.DONE: 30}
+PRIORITY_WEIGHTS = {TaskPriority.LOW: 30, TaskPriority.MEDIUM: 50, TaskPriority.HIGH: 20}
+MANAGER_SHARE = 0.05
+
+
+@dataclass
+class SeedResult:
+    user_ids: List[int]
+    admin_id: int
+    task_count: int
+    password: str = SEED_PASSWORD
+
+
+def insert_rows(db: Session, table, columns: List[str], rows: List[tuple]):
+    if not rows:
+        return
+    if use_copy(db):
+        copy_records(db, table, columns, [
+            tuple(value.name if isinstance(value, Enum) else value for value in row) for row in rows
+        ])
+    else:
+        db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def next_id(db: Session, column) -> int:
+    return (db.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def seed_data(db: Session, users: int, tasks: int, seed: int = 0) -> SeedResult:
+    """Add ``users`` users and ``tasks`` tasks in one transaction.
+
+    The first new user is an admin, MANAGER_SHARE of them managers and the
+    rest regular users. Responsible users and executors follow a skewed
+    distribution: a few users get most of the work.
+    """
+    rng = random.Random(seed)
+    initialize_permissions(db)
+    roles = dict(db.execute(select(Role.name, Role.id)).all())
+    password = get_password_hash(SEED_PASSWORD)
+
+    first_user_id = next_id(db, User.id)
+    user_ids = list(range(first_user_id, first_user_id + users))
+    insert_rows(db, User.__table__, ["id", "email", "password", "first_name", "last_name", "super_user"], [
+        (user_id, f"user{user_id}@example.com", password, rng.choice(VERBS), f"User {user_id}", False)
+        for user_id in user_ids
+    ])
+    manager_count = int(users * MANAGER_SHARE)
+    insert_rows(db, UserRole.__table__, ["user_id", "role_id"], [
+        (user_id, roles[RoleName.ADMIN if index == 0 else RoleName.MANAGER if index <= manager_count else RoleName.USER])
+        for index, user_id in enumerate(user_ids)
+    ])
+
+    # Zipf-like popularity, the users are shuffled so that it is not tied to the id
+    popular_users = user_ids[:]
+    rng.shuffle(popular_users)
+    user_weights = list(accumulate(1 / rank for rank in range(1, users + 1)))
+    statuses, status_weights = list(STATUS_WEIGHTS), list(accumulate(STATUS_WEIGHTS.values()))
+    priorities, priority_weights = list(PRIORITY_WEIGHTS), list(accumulate(PRIORITY_WEIGHTS.values()))
+    executor_counts = list(range(len(EXECUTOR_COUNT_WEIGHTS)))
+    executor_count_weights = list(accumulate(EXECUTOR_COUNT_WEIGHTS))
+
+    first_task_id = next_id(db, Task.id)
+    for start in range(0, tasks, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, tasks - start)
+        task_ids = range(first_task_id + start, first_task_id + start + size)
+        responsible = rng.choices(popular_users, cum_weights=user_weights, k=size) if users else [None] * size
+        task_statuses = rng.choices(statuses, cum_weights=status_weights, k=size)
+        task_priorities = rng.choices(priorities, cum_weights=priority_weights, k=size)
+        insert_rows(db, Task.__table__, ["id", "title", "description", "status", "priority", "responsible_id", "version"], [
+            (
+                task_id,
+                f"{rng.choice(VERBS)} {rng.choice(NOUNS)}",
+                f"Generated task {task_id}: {rng.choice(VERBS).lower()} the {rng.choice(NOUNS)}",
+                task_status,
+                priority,
+                responsible_id,
+                1,
+            )
+            for task_id, task_status, priority, responsible_id in zip(task_ids, task_statuses, task_priorities, responsible)
+        ])
+
+        executors = []
+        if users:
+            counts = rng.choices(executor_counts, cum_weights=executor_count_weights, k=size)
+            for task_id, count in zip(task_ids, counts):
+                picked = set(rng.choices(popular_users, cum_weights=user_weights, k=count))
+                executors.extend((task_id, user_id) for user_id in picked)
+        insert_rows(db, TaskExecutors.__table__, ["task_id", "user_id"], executors)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Rows were written with explicit ids, move the sequences past them
+        for table in (User.__table__, Task.__table__):
+            db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            ))
+    if tasks:
+        mark_tasks_changed(db)
+    db.commit()
+    # Fresh planner statistics for the new rows
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+    return SeedResult(user_ids=user_ids, admin_id=first_user_id, task_count=tasks)
+
+
+async def run_seed(users: int, tasks: int, seed: int) -> SeedResult:
+    from database import SessionLocal
+
+    async with SessionLocal() as db:
+        return await db.run_sync(seed_data, users, tasks, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the database with generated users and tasks.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    logging.getLogger('passlib').setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    result = asyncio.run(run_seed(args.users, args.tasks, args.seed))
+    print(f"Created {len(result.user_ids)} users and {result.task_count} tasks "
+          f"in {time.perf_counter() - started:.1f}s, password: {result.password}")
+
+
+if __name__ == "__main__":
+    main()
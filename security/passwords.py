@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from settings import PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+# Hashes made with another cost factor are reported by needs_update()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a few threads hash in parallel while the
+# event loop keeps serving other requests. Extra calls wait for a free worker.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, get_password_hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop.
+
+    Returns whether it matches and, if the stored hash is stale (e.g. made
+    with another cost factor), a new hash to store in its place.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
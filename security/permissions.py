@@ -1,23 +1,75 @@
-from sqlalchemy import select
+from itertools import chain
+from typing import FrozenSet, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from accounts.models import User, Permission, UserRole, RolePermission
+from accounts.models import Permission, UserRole, RolePermission
+from accounts.schemas import CurrentUser
+from common.cache import TTLCache
 from common.constants import PermissionName
+from monitoring.tracing import traced
+from settings import PERMISSION_CACHE_SIZE, PERMISSION_CACHE_TTL
+
+# user id -> frozenset of PermissionName
+permission_cache = TTLCache(maxsize=PERMISSION_CACHE_SIZE, ttl=PERMISSION_CACHE_TTL)
+
+_PENDING_CHANGES_KEY = "permission_cache_changes"
+
+
+@traced()
+async def get_user_permissions(user_id: int, db: AsyncSession) -> FrozenSet[PermissionName]:
+    permissions = permission_cache.get(user_id)
+    if permissions is None:
+        result = await db.execute(
+            select(Permission.access_level)
+            .join(RolePermission, RolePermission.permission_id == Permission.id)
+            .join(UserRole, UserRole.role_id == RolePermission.role_id)
+            .where(UserRole.user_id == user_id)
+            .distinct()
+        )
+        permissions = frozenset(result.scalars().all())
+        permission_cache.set(user_id, permissions)
+    return permissions
+
+
+@traced()
+async def has_permission(user: CurrentUser, permission_name: PermissionName, db: AsyncSession) -> bool:
+    return permission_name in await get_user_permissions(user.id, db)
+
+
+def invalidate_permission_cache(user_id: Optional[int] = None):
+    if user_id is None:
+        permission_cache.clear()
+    else:
+        permission_cache.pop(user_id)
+
+
+def _collect_permission_changes(session, flush_context):
+    changes = session.info.setdefault(_PENDING_CHANGES_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, RolePermission):
+            # A role's permissions changed, so every user may be affected
+            changes.add(None)
+        elif isinstance(obj, UserRole):
+            changes.add(None if obj in session.dirty else obj.user_id)
+
+
+def _apply_permission_changes(session):
+    changes = session.info.pop(_PENDING_CHANGES_KEY, None)
+    if not changes:
+        return
+    if None in changes:
+        invalidate_permission_cache()
+    else:
+        for user_id in changes:
+            invalidate_permission_cache(user_id)
 
-def has_permission(user: User, permission_name: PermissionName, db: Session) -> bool:
-    user_roles = db.execute(
-        select(UserRole).where(UserRole.user_id == user.id)
-    ).scalars().all()
 
-    for user_role in user_roles:
-        role_permissions = db.execute(
-            select(RolePermission).where(RolePermission.role_id == user_role.role_id)
-        ).scalars().all()
+def _discard_permission_changes(session):
+    session.info.pop(_PENDING_CHANGES_KEY, None)
 
-        for role_permission in role_permissions:
-            permission = db.execute(
-                select(Permission).where(Permission.id == role_permission.permission_id)
-            ).scalars().first()
 
-            if permission and permission.access_level == permission_name:
-                return True
-    return False
+event.listen(Session, 'after_flush', _collect_permission_changes)
+event.listen(Session, 'after_commit', _apply_permission_changes)
+event.listen(Session, 'after_rollback', _discard_permission_changes)
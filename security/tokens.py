@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from accounts.models import Token
+from common.cache import TTLCache
+from database import SessionLocal
+from settings import (
+    TOKEN_CACHE_SIZE,
+    TOKEN_CACHE_TTL,
+    TOKEN_TTL,
+    TOKEN_PURGE_INTERVAL,
+    TOKEN_PURGE_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# bearer token -> CurrentUser snapshot
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+_PENDING_TOKENS_KEY = "token_cache_changes"
+
+
+def invalidate_token(token: Optional[str] = None):
+    if token is None:
+        token_cache.clear()
+    else:
+        token_cache.pop(token)
+
+
+def token_expiry_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Tokens issued before this moment are expired, None when tokens never expire."""
+    if not TOKEN_TTL:
+        return None
+    return (now or datetime.utcnow()) - timedelta(seconds=TOKEN_TTL)
+
+
+def token_cache_ttl(issued_at: datetime) -> float:
+    """Cache lifetime of a token lookup, never past the token's expiry."""
+    if not TOKEN_TTL:
+        return TOKEN_CACHE_TTL
+    remaining = TOKEN_TTL - (datetime.utcnow() - issued_at).total_seconds()
+    return max(0.0, min(TOKEN_CACHE_TTL, remaining))
+
+
+async def purge_expired_tokens(db: AsyncSession, batch_size: int = TOKEN_PURGE_BATCH_SIZE) -> int:
+    """Delete expired tokens and return their number.
+
+    Each batch is its own short transaction, so logins and lookups are not
+    blocked behind one long delete.
+    """
+    cutoff = token_expiry_cutoff()
+    if cutoff is None:
+        return 0
+    purged = 0
+    while True:
+        rows = (await db.execute(
+            select(Token.id, Token.token)
+            .where(or_(Token.issued_at < cutoff, Token.issued_at.is_(None)))
+            .order_by(Token.issued_at)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            return purged
+        await db.execute(delete(Token).where(Token.id.in_([token_id for token_id, _ in rows])))
+        await db.commit()
+        for _, token in rows:
+            invalidate_token(token)
+        purged += len(rows)
+
+
+async def run_token_purge(stop_event: Optional[asyncio.Event] = None):
+    stop_event = stop_event or asyncio.Event()
+    while not stop_event.is_set():
+        try:
+            async with SessionLocal() as db:
+                purged = await purge_expired_tokens(db)
+            if purged:
+                logger.info("Purged %s expired tokens", purged)
+        except Exception:
+            logger.exception("Failed to purge expired tokens")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=TOKEN_PURGE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _collect_deleted_tokens(session, flush_context):
+    tokens = session.info.setdefault(_PENDING_TOKENS_KEY, set())
+    for obj in session.deleted:
+        if isinstance(obj, Token):
+            tokens.add(obj.token)
+
+
+def _apply_deleted_tokens(session):
+    for token in session.info.pop(_PENDING_TOKENS_KEY, ()):
+        invalidate_token(token)
+
+
+def _discard_deleted_tokens(session):
+    session.info.pop(_PENDING_TOKENS_KEY, None)
+
+
+event.listen(Session, 'after_flush', _collect_deleted_tokens)
+event.listen(Session, 'after_commit', _apply_deleted_tokens)
+event.listen(Session, 'after_rollback', _discard_deleted_tokens)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 POSTGRES_USER = os.getenv('POSTGRES_USER')
@@ -6,3 +7,97 @@ POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
 POSTGRES_DB = os.getenv('POSTGRES_DB')
 DB_HOST = os.getenv('DB_HOST')
 DB_PORT = os.getenv('DB_PORT')
+
+# Full SQLAlchemy URL, overrides the POSTGRES_* / DB_* variables above
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+# Connection pool (not used with SQLite). Pool exhaustion raises after
+# DB_POOL_TIMEOUT seconds, see GET /monitoring/db-pool
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+# Comma-separated SQLAlchemy URLs of read replicas for read-only routes.
+# After a write the same user reads from the primary for
+# DB_REPLICA_STICKINESS seconds (tracked per worker process).
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+DB_REPLICA_STICKINESS = float(os.getenv('DB_REPLICA_STICKINESS', 5))
+
+# Threads for sync routes and dependencies; matches the connections a
+# worker can open by default
+THREADPOOL_SIZE = int(os.getenv('THREADPOOL_SIZE', DB_POOL_SIZE + DB_MAX_OVERFLOW))
+
+# bcrypt cost factor of new password hashes; stored hashes with another
+# cost are rehashed on the next login
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+# Threads hashing and verifying passwords, i.e. logins checked in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+
+# In-process cache of resolved user permissions. Role changes clear it only in
+# the process that made them; with several workers the others keep the old
+# permissions for up to the TTL.
+PERMISSION_CACHE_SIZE = int(os.getenv('PERMISSION_CACHE_SIZE', 1024))
+PERMISSION_CACHE_TTL = float(os.getenv('PERMISSION_CACHE_TTL', 300))
+
+# In-process cache of bearer token -> user lookups. Entries are dropped on
+# logout; with several workers a revoked token may live up to the TTL elsewhere.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))
+TOKEN_CACHE_TTL = float(os.getenv('TOKEN_CACHE_TTL', 60))
+
+# Bearer tokens expire TOKEN_TTL seconds after login (0 = never), a login
+# beyond TOKEN_MAX_PER_USER active tokens drops the user's oldest ones
+# (0 = no cap)
+TOKEN_TTL = float(os.getenv('TOKEN_TTL', 30 * 24 * 3600))
+TOKEN_MAX_PER_USER = int(os.getenv('TOKEN_MAX_PER_USER', 20))
+# Expired tokens are deleted in batches, every TOKEN_PURGE_INTERVAL seconds
+# in-process or by `python -m scripts.purge_tokens`
+TOKEN_PURGE_ENABLED = os.getenv('TOKEN_PURGE_ENABLED', 'true').lower() == 'true'
+TOKEN_PURGE_INTERVAL = float(os.getenv('TOKEN_PURGE_INTERVAL', 3600))
+TOKEN_PURGE_BATCH_SIZE = int(os.getenv('TOKEN_PURGE_BATCH_SIZE', 1000))
+
+# Paginator: estimated totals below this size are replaced by an exact count
+PAGINATION_EXACT_COUNT_THRESHOLD = int(os.getenv('PAGINATION_EXACT_COUNT_THRESHOLD', 100000))
+# Largest page_size accepted by list endpoints, bigger dumps go through the export
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 100))
+
+# Rows fetched per round trip by the streaming task export
+TASK_EXPORT_CHUNK_SIZE = int(os.getenv('TASK_EXPORT_CHUNK_SIZE', 1000))
+
+# Status-change email outbox
+OUTBOX_WORKER_ENABLED = os.getenv('OUTBOX_WORKER_ENABLED', 'true').lower() == 'true'
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 5))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_BACKOFF = float(os.getenv('OUTBOX_RETRY_BACKOFF', 30))
+# Seconds a claimed batch stays hidden from other workers, should outlast sending it
+OUTBOX_LEASE_TIME = float(os.getenv('OUTBOX_LEASE_TIME', 300))
+
+# Maximum number of items accepted by the /tasks:batch endpoints
+TASK_BATCH_MAX_SIZE = int(os.getenv('TASK_BATCH_MAX_SIZE', 1000))
+
+# Rows written per COPY / INSERT by the task import
+TASK_IMPORT_CHUNK_SIZE = int(os.getenv('TASK_IMPORT_CHUNK_SIZE', 5000))
+
+# Request metrics middleware and the Prometheus endpoint at /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Slow-query log: statements slower than the threshold (seconds) are logged
+# with their plan, one EXPLAIN per distinct statement per interval (seconds)
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'false').lower() == 'true'
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+
+# Super users can profile a request with the X-Profile: 1 header, the
+# profiles are written to PROFILING_DIR
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'taskflow-profiles'))
+
+# Request tracing: share of requests traced (requests with a sampled W3C
+# traceparent always are), finished traces kept for /monitoring/traces and
+# an optional JSON-lines file they are appended to
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 1.0))
+TRACING_BUFFER_SIZE = int(os.getenv('TRACING_BUFFER_SIZE', 200))
+TRACING_EXPORT_PATH = os.getenv('TRACING_EXPORT_PATH', '')
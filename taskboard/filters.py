@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from fastapi import Query
+from sqlalchemy import select
+
+from common.constants import TaskStatus, TaskPriority
+from pagination import Paginator
+from .models import Task, TaskExecutors
+from .search import apply_search
+
+
+class TaskFilters:
+    """Query parameters shared by the endpoints that list tasks.
+
+    Every filter parameter may be repeated to match any of several values,
+    e.g. ``?status=TODO&status=In progress``. ``q`` is a full-text search
+    over title and description.
+    """
+
+    def __init__(
+        self,
+        q: Optional[str] = Query(None, min_length=1),
+        status: Optional[List[TaskStatus]] = Query(None),
+        priority: Optional[List[TaskPriority]] = Query(None),
+        responsible_id: Optional[List[int]] = Query(None),
+        executor_id: Optional[List[int]] = Query(None)
+    ):
+        self.q = q
+        self.status = status
+        self.priority = priority
+        self.responsible_id = responsible_id
+        self.executor_id = executor_id
+
+    def apply(self, query, dialect_name: str):
+        query = Paginator.filter_query(
+            query,
+            status=self.status,
+            priority=self.priority,
+            responsible_id=self.responsible_id
+        )
+        if self.executor_id:
+            query = query.where(Task.id.in_(
+                select(TaskExecutors.task_id).where(TaskExecutors.user_id.in_(self.executor_id))
+            ))
+        if self.q:
+            query = apply_search(query, self.q, dialect_name)
+        return query
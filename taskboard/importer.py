@@ -0,0 +1,158 @@
+import asyncio
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, List, Set, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from accounts.models import User
+from settings import TASK_IMPORT_CHUNK_SIZE
+from .models import Task, TaskExecutors
+from .schemas import TaskCreate, TaskImportError, TaskImportResult
+from .versioning import mark_tasks_changed
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+TASK_COLUMNS = ["id", "title", "description", "status", "priority", "responsible_id", "version"]
+
+
+def read_rows(lines: Iterable[str], import_format: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (row number, raw task fields) from NDJSON or CSV lines.
+
+    Rows are numbered from 1, the CSV header is not counted. CSV files use
+    the column names of the export; ``executor_ids`` holds space-separated
+    ids and an ``id`` column is ignored. Unparsable rows yield an error
+    message instead of the fields.
+    """
+    if import_format == "ndjson":
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, orjson.loads(line)
+            except orjson.JSONDecodeError as error:
+                yield number, f"Invalid JSON: {error}"
+        return
+
+    reader = csv.DictReader(lines)
+    for number, record in enumerate(reader, start=1):
+        if None in record:
+            yield number, "Too many columns"
+            continue
+        fields = {key: value for key, value in record.items() if value not in (None, "")}
+        fields.pop("id", None)
+        if "executor_ids" in fields:
+            fields["executor_ids"] = fields["executor_ids"].split()
+        yield number, fields
+
+
+def validate_row(fields, user_ids: Set[int]):
+    """Return a TaskCreate for ``fields`` or an error message."""
+    if isinstance(fields, str):
+        return fields
+    try:
+        task = TaskCreate.model_validate(fields)
+    except ValidationError as error:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+        )
+    if task.responsible_id not in user_ids:
+        return f"Responsible user with ID {task.responsible_id} not found."
+    unknown = sorted(set(task.executor_ids) - user_ids)
+    if unknown:
+        return f"Executor users with IDs {unknown} not found."
+    return task
+
+
+def use_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+
+def copy_records(db: Session, table, columns: List[str], records: List[tuple]):
+    # COPY goes through the driver connection of the session's transaction
+    driver_connection = db.connection().connection.driver_connection
+    await_only(driver_connection.copy_records_to_table(table.name, records=records, columns=columns))
+
+
+def insert_chunk(db: Session, tasks: List[TaskCreate]) -> int:
+    if use_copy(db):
+        # COPY returns no ids, take them from the sequence up front
+        task_ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('tasks', 'id')) FROM generate_series(1, :count)"),
+            {"count": len(tasks)}
+        ).scalars().all()
+        copy_records(db, Task.__table__, TASK_COLUMNS, [
+            (task_id, task.title, task.description, task.status.name, task.priority.name, task.responsible_id, 1)
+            for task_id, task in zip(task_ids, tasks)
+        ])
+    else:
+        task_ids = db.execute(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True),
+            [task.model_dump(exclude={"executor_ids"}) for task in tasks]
+        ).scalars().all()
+
+    task_executors = [
+        (task_id, user_id)
+        for task_id, task in zip(task_ids, tasks)
+        for user_id in dict.fromkeys(task.executor_ids)
+    ]
+    if task_executors:
+        if use_copy(db):
+            copy_records(db, TaskExecutors.__table__, ["task_id", "user_id"], task_executors)
+        else:
+            db.execute(
+                insert(TaskExecutors),
+                [{"task_id": task_id, "user_id": user_id} for task_id, user_id in task_executors]
+            )
+    return len(task_ids)
+
+
+def parse_chunk(rows: Iterator[Tuple[int, object]], user_ids: Set[int]):
+    """Read and validate the next TASK_IMPORT_CHUNK_SIZE rows.
+
+    Returns (rows read, valid tasks, rejected rows). Runs in a worker thread,
+    decoding and validation are the CPU-heavy part of an import.
+    """
+    tasks: List[TaskCreate] = []
+    errors: List[TaskImportError] = []
+    read = 0
+    for number, fields in islice(rows, TASK_IMPORT_CHUNK_SIZE):
+        read += 1
+        task = validate_row(fields, user_ids)
+        if isinstance(task, str):
+            errors.append(TaskImportError(row=number, detail=task))
+        else:
+            tasks.append(task)
+    return read, tasks, errors
+
+
+async def import_tasks(db: AsyncSession, lines: Iterable[str], import_format: str) -> TaskImportResult:
+    """Insert the tasks read from ``lines`` and report the rejected rows.
+
+    Each chunk of TASK_IMPORT_CHUNK_SIZE rows is parsed and validated in a
+    worker thread, then written with COPY on PostgreSQL and multi-row
+    INSERTs elsewhere. Everything is committed together at the end. User
+    ids are loaded once for the whole import.
+    """
+    user_ids = set((await db.execute(select(User.id))).scalars().all())
+    result = TaskImportResult(imported=0, errors=[])
+
+    rows = read_rows(lines, import_format)
+    while True:
+        read, tasks, errors = await asyncio.to_thread(parse_chunk, rows, user_ids)
+        if not read:
+            break
+        result.errors.extend(errors)
+        if tasks:
+            result.imported += await db.run_sync(insert_chunk, tasks)
+
+    if result.imported:
+        mark_tasks_changed(db)
+    await db.commit()
+    return result
@@ -1,10 +1,11 @@
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, \
-    UniqueConstraint, event, inspect
+    UniqueConstraint, Index, DDL, event, inspect, insert, select, literal
 from sqlalchemy.orm import relationship
 from database import Base
 from accounts.models import User
 from common.constants import TaskStatus, TaskPriority
-from email_notification.email_sender import send_email
+from email_notification.models import OutboxMessage
+from monitoring.tracing import traced
 
 
 class Task(Base):
@@ -16,10 +17,17 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.TODO, nullable=False)
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM, nullable=False)
     responsible_id = Column(Integer, ForeignKey("users.id"))
+    # Bumped on every change of the task or its executors, used for ETags
+    version = Column(Integer, default=1, nullable=False)
 
     responsible = relationship("User", back_populates="tasks_responsible")
     executors = relationship("User", secondary="task_executors")
 
+    __table_args__ = (
+        Index('ix_tasks_status_priority_id', 'status', 'priority', 'id'),
+        Index('ix_tasks_responsible_id_id', 'responsible_id', 'id'),
+    )
+
 
 class TaskExecutors(Base):
     __tablename__ = "task_executors"
@@ -30,9 +38,42 @@ class TaskExecutors(Base):
 
     __table_args__ = (
         UniqueConstraint('task_id', 'user_id', name='_task_user_uc'),
+        Index('ix_task_executors_user_id_task_id', 'user_id', 'task_id'),
     )
 
 
+class TableVersion(Base):
+    """Change counter of a whole table, bumped once per writing transaction."""
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+event.listen(
+    TableVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO table_versions (name, version) VALUES ('tasks', 0)")
+)
+
+
+def bump_version(task: Task):
+    """Increment the task version in the UPDATE itself.
+
+    A value computed in Python from the loaded version would let two
+    concurrent updates both write N+1 and share an ETag.
+    """
+    task.version = Task.version + 1
+
+
+def before_update_listener(mapper, connection, target):
+    state = inspect(target)
+    # The executors routes bump the version themselves
+    if state.session.is_modified(target) and not state.attrs.version.history.has_changes():
+        bump_version(target)
+
+
+@traced()
 def after_update_listener(mapper, connection, target):
     state = inspect(target)
     history = state.attrs.status.history
@@ -40,10 +81,18 @@ def after_update_listener(mapper, connection, target):
         old_status = history.deleted[0] if history.deleted else None
         new_status = history.added[0] if history.added else None
         if new_status and new_status != old_status:
-            if target.responsible:
+            if target.responsible_id:
                 subject = f"Статус задачі '{target.title}' змінився на {target.status.value}"
                 body = f"Ваша задача '{target.title}' зараз має статус: {target.status.value}."
 
-                send_email(target.responsible.email, subject, body)
+                # Queue the email in the same transaction, the outbox worker sends it
+                connection.execute(
+                    insert(OutboxMessage).from_select(
+                        ["to_email", "subject", "body"],
+                        select(User.email, literal(subject), literal(body))
+                        .where(User.id == target.responsible_id)
+                    )
+                )
 
+event.listen(Task, 'before_update', before_update_listener)
 event.listen(Task, 'after_update', after_update_listener)
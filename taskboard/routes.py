@@ -1,40 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from fastapi.responses import JSONResponse
-from sqlalchemy import delete, select
-from sqlalchemy.orm import Session
+import csv
+import io
+import tempfile
+from enum import Enum
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings import PAGINATION_MAX_PAGE_SIZE, TASK_EXPORT_CHUNK_SIZE
 from starlette import status
 
 from accounts.routes import get_current_user
 from common.constants import PermissionName
+from common.etag import make_etag, etag_matches
 from dependencies import permission_required
 from security.permissions import has_permission
-from .schemas import TaskCreate, TaskUpdate, TaskOut
-from .models import Task, TaskExecutors
+from .schemas import (
+    TaskCreate,
+    TaskUpdate,
+    TaskOut,
+    TaskBatchCreate,
+    TaskBatchUpdate,
+    TaskBatchDelete,
+    TaskBatchResult,
+    TaskImportResult,
+    NOT_NULL_UPDATE_FIELDS
+)
+from .models import Task, TaskExecutors, bump_version
+from .filters import TaskFilters
+from .importer import import_tasks
+from .versioning import mark_tasks_changed, get_tasks_version
 from accounts.models import User
-from database import get_db
-from typing import List, Set, Optional
+from accounts.schemas import CurrentUser
+from database import get_db, get_read_db
+from monitoring.tracing import traced
+from typing import AsyncIterator, Dict, List, Literal, Set, Optional
 
 from pagination import get_paginator, Paginator
 
 router = APIRouter()
 
+# Columns of TaskOut, list pages are read as plain rows instead of ORM objects
+TASK_LIST_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.priority,
+    Task.responsible_id,
+)
 
-def get_task_or_404(task_id: int, db: Session) -> Task:
-    task = db.execute(select(Task).where(Task.id == task_id)).scalars().first()
+
+async def get_task_or_404(task_id: int, db: AsyncSession) -> Task:
+    task = (await db.execute(select(Task).where(Task.id == task_id))).scalars().first()
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     return task
 
 
-def validate_and_get_users(executor_ids: Set[int], db: Session) -> List[User]:
-    existing_users = db.execute(
+async def validate_and_get_users(executor_ids: Set[int], db: AsyncSession) -> List[User]:
+    existing_users = (await db.execute(
         select(User).where(User.id.in_(executor_ids))
-    ).scalars().all()
+    )).scalars().all()
     return existing_users
 
 
-def validate_responsible_user(responsible_id: int, db: Session) -> User:
-    user = db.execute(select(User).where(User.id == responsible_id)).scalars().first()
+async def validate_responsible_user(responsible_id: int, db: AsyncSession) -> User:
+    user = (await db.execute(select(User).where(User.id == responsible_id))).scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -43,54 +76,204 @@ def validate_responsible_user(responsible_id: int, db: Session) -> User:
     return user
 
 
-def assign_executors(task: Task, executor_ids: Optional[List[int]], db: Session):
+async def get_existing_user_ids(user_ids: Set[int], db: AsyncSession) -> Set[int]:
+    if not user_ids:
+        return set()
+    return set((await db.execute(select(User.id).where(User.id.in_(user_ids)))).scalars().all())
+
+
+async def get_executor_ids(task_ids: List[int], db: AsyncSession) -> Dict[int, List[int]]:
+    """Executor ids of several tasks, read from task_executors in one query."""
+    executor_ids = {task_id: [] for task_id in task_ids}
+    if task_ids:
+        rows = await db.execute(
+            select(TaskExecutors.task_id, TaskExecutors.user_id)
+            .where(TaskExecutors.task_id.in_(task_ids))
+            .order_by(TaskExecutors.id)
+        )
+        for task_id, user_id in rows:
+            executor_ids[task_id].append(user_id)
+    return executor_ids
+
+
+@traced()
+async def assign_executors(task: Task, executor_ids: Optional[List[int]], db: AsyncSession) -> Optional[List[int]]:
     if executor_ids is not None:
         unique_executor_ids = set(executor_ids)
-        users = validate_and_get_users(unique_executor_ids, db)
+        users = await validate_and_get_users(unique_executor_ids, db)
 
-        db.execute(delete(TaskExecutors).where(TaskExecutors.task_id == task.id))
+        await db.execute(delete(TaskExecutors).where(TaskExecutors.task_id == task.id))
+        mark_tasks_changed(db)
+        bump_version(task)
 
         task_executors = [
             TaskExecutors(task_id=task.id, user_id=user.id)
             for user in users
         ]
-        db.bulk_save_objects(task_executors)
-        db.commit()
+        db.add_all(task_executors)
+        await db.commit()
+
+        return [user.id for user in users]
+
+
+@traced("serialize")
+def render_task_rows(rows, executor_ids: Dict[int, List[int]]) -> bytes:
+    """Serialize rows of TASK_LIST_COLUMNS to the JSON of a TaskOut list."""
+    # Rows are unpacked by position, attribute access by name is ~10x slower.
+    # Extra trailing columns (the search rank) are ignored.
+    return orjson.dumps([
+        {
+            "id": task_id,
+            "title": title,
+            "description": description,
+            "status": task_status,
+            "priority": priority,
+            "responsible_id": responsible_id,
+            "executor_ids": executor_ids[task_id],
+        }
+        for task_id, title, description, task_status, priority, responsible_id, *_ in rows
+    ])
 
 
 @router.get("/tasks", response_model=List[TaskOut])
-def get_all_tasks(
-    response: Response,
+async def get_all_tasks(
     paginator: Paginator = Depends(get_paginator),
+    filters: TaskFilters = Depends(),
     order_by: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1)
+    page_size: int = Query(10, ge=1, le=PAGINATION_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    # Defaults to true for page numbers and to false with a cursor
+    include_total: Optional[bool] = Query(None),
+    estimate_total: bool = Query(False)
 ):
-    query = select(Task)
-    tasks, total_tasks = paginator.paginate(query, order_by=order_by, page=page, page_size=page_size)
-    total_pages = (total_tasks + page_size - 1) // page_size
+    # Answer polls of an unchanged table before running the page query
+    tasks_version = await get_tasks_version(paginator.db)
+    etag = make_etag("tasks", tasks_version, sorted(paginator.request.query_params.multi_items()))
+    if etag_matches(paginator.request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    query = filters.apply(select(*TASK_LIST_COLUMNS), paginator.db.get_bind().dialect.name)
+    if filters.q and not order_by:
+        # Best matches first
+        order_by = "-rank"
+    try:
+        Paginator.get_ordering(query, order_by)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    rows, total_tasks = await paginator.paginate(
+        query,
+        order_by=order_by,
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        estimate_total=estimate_total
+    )
+
+    executor_ids = await get_executor_ids([row.id for row in rows], paginator.db)
+
+    headers = {}
+    if total_tasks is not None:
+        total_pages = (total_tasks + page_size - 1) // page_size
+        headers["X-Total-Count"] = str(total_tasks)
+        headers["X-Total-Pages"] = str(total_pages)
+        if paginator.total_is_estimate:
+            headers["X-Total-Count-Estimated"] = "true"
+    if not cursor:
+        headers["X-Current-Page"] = str(page)
+    headers["X-Page-Size"] = str(page_size)
+    if paginator.next_cursor:
+        headers["X-Next-Cursor"] = paginator.next_cursor
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "no-cache"
+
+    # The rows already have the TaskOut shape, skip model validation and
+    # the response_model pass (response_model is kept for the schema)
+    return Response(
+        content=render_task_rows(rows, executor_ids),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+EXPORT_FIELDS = [column.key for column in TASK_LIST_COLUMNS]
 
-    tasks_with_executors = []
-    for task in tasks:
-        executor_ids = [executor.id for executor in task.executors]
-        task.executor_ids = executor_ids
-        tasks_with_executors.append(TaskOut.model_validate(task))
 
-    response.headers["X-Total-Count"] = str(total_tasks)
-    response.headers["X-Total-Pages"] = str(total_pages)
-    response.headers["X-Current-Page"] = str(page)
-    response.headers["X-Page-Size"] = str(page_size)
+@traced("serialize")
+def render_export_chunk(rows, executor_ids: Dict[int, List[int]], export_format: str) -> bytes:
+    # Rows may carry extra columns (the search rank), only EXPORT_FIELDS are written
+    if export_format == "ndjson":
+        return b"".join(
+            orjson.dumps({
+                **dict(zip(EXPORT_FIELDS, row)),
+                "executor_ids": executor_ids[row[0]]
+            }) + b"\n"
+            for row in rows
+        )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = row[:len(EXPORT_FIELDS)]
+        writer.writerow(
+            [value.value if isinstance(value, Enum) else value for value in values]
+            + [" ".join(str(user_id) for user_id in executor_ids[row[0]])]
+        )
+    return buffer.getvalue().encode()
+
+
+async def stream_tasks(query, export_format: str, db: AsyncSession) -> AsyncIterator[bytes]:
+    """Yield the export of ``query`` chunk by chunk.
+
+    The rows are read through a server-side cursor, TASK_EXPORT_CHUNK_SIZE at
+    a time, so memory use does not depend on the number of tasks. The
+    request's session is closed once the response starts, the export runs
+    in a session of its own on the same engine.
+    """
+    if export_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS + ["executor_ids"])
+        yield buffer.getvalue().encode()
 
-    return tasks_with_executors
+    async with AsyncSession(bind=db.bind) as export_db:
+        result = await export_db.stream(query.execution_options(yield_per=TASK_EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions():
+            executor_ids = await get_executor_ids([row.id for row in rows], export_db)
+            yield render_export_chunk(rows, executor_ids, export_format)
+
+
+@router.get("/tasks/export")
+async def export_tasks(
+    filters: TaskFilters = Depends(),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    order_by: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    query = filters.apply(select(*TASK_LIST_COLUMNS), db.get_bind().dialect.name)
+    if filters.q and not order_by:
+        order_by = "-rank"
+    try:
+        ordering = Paginator.get_ordering(query, order_by)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    query = query.order_by(*[Paginator.order_clause(column, descending) for column, descending in ordering])
+
+    media_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        stream_tasks(query, export_format, db),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format}"'}
+    )
 
 
 @router.post("/tasks", response_model=TaskOut, dependencies=[Depends(permission_required(PermissionName.CREATE_TASK))])
-def create_task(
+async def create_task(
         task: TaskCreate,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        db: AsyncSession = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
 ):
-    validate_responsible_user(task.responsible_id, db)
+    await validate_responsible_user(task.responsible_id, db)
 
     new_task = Task(
         title=task.title,
@@ -100,53 +283,235 @@ def create_task(
         responsible_id=task.responsible_id
     )
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await db.commit()
+    await db.refresh(new_task)
 
-    assign_executors(new_task, task.executor_ids, db)
-
-    executor_ids = [executors.id for executors in new_task.executors]
-    new_task.executor_ids = executor_ids
+    new_task.executor_ids = await assign_executors(new_task, task.executor_ids, db)
     return new_task
 
 
 @router.get("/tasks/{task_id}", response_model=TaskOut, dependencies=[Depends(get_current_user)])
-def get_task(task_id: int, db: Session = Depends(get_db)):
-    task = get_task_or_404(task_id, db)
-    executor_ids = [executor.id for executor in task.executors]
-    task.executor_ids = executor_ids
+async def get_task(task_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    task = await get_task_or_404(task_id, db)
+
+    etag = make_etag("task", task.id, task.version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+    task.executor_ids = (await get_executor_ids([task.id], db))[task.id]
     return task
 
 
 @router.put("/tasks/{task_id}", response_model=TaskOut, dependencies=[Depends(permission_required(PermissionName.UPDATE_TASK))])
-def update_task(task_id: int, task_update: TaskUpdate,
-                db: Session = Depends(get_db)):
-    task = get_task_or_404(task_id, db)
+async def update_task(task_id: int, task_update: TaskUpdate,
+                db: AsyncSession = Depends(get_db)):
+    task = await get_task_or_404(task_id, db)
 
     update_data = task_update.model_dump(exclude_unset=True)
 
     if "responsible_id" in update_data:
-        validate_responsible_user(update_data["responsible_id"], db)
+        await validate_responsible_user(update_data["responsible_id"], db)
 
     for field, value in update_data.items():
         if field != "executor_ids":
             setattr(task, field, value)
 
+    executor_ids = None
     if "executor_ids" in update_data:
-        assign_executors(task, task_update.executor_ids, db)
+        executor_ids = await assign_executors(task, task_update.executor_ids, db)
 
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
 
-    executor_ids = [executor.id for executor in task.executors]
+    if executor_ids is None:
+        executor_ids = (await get_executor_ids([task.id], db))[task.id]
     task.executor_ids = executor_ids
     return task
 
 
 @router.delete("/tasks/{task_id}", dependencies=[Depends(permission_required(PermissionName.DELETE_TASK))])
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    task = get_task_or_404(task_id, db)
-    db.execute(delete(TaskExecutors).where(TaskExecutors.task_id == task_id))
-    db.delete(task)
-    db.commit()
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
+    task = await get_task_or_404(task_id, db)
+    await db.execute(delete(TaskExecutors).where(TaskExecutors.task_id == task_id))
+    await db.delete(task)
+    await db.commit()
     return {"msg": "Task deleted"}
+
+
+def responsible_not_found(index: int, responsible_id: int, task_id: Optional[int] = None) -> TaskBatchResult:
+    return TaskBatchResult(
+        index=index,
+        id=task_id,
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Responsible user with ID {responsible_id} not found."
+    )
+
+
+@router.post("/tasks:batch", response_model=List[TaskBatchResult], dependencies=[Depends(permission_required(PermissionName.CREATE_TASK))])
+async def create_tasks_batch(batch: TaskBatchCreate, db: AsyncSession = Depends(get_db)):
+    user_ids = set()
+    for item in batch.items:
+        user_ids.add(item.responsible_id)
+        user_ids.update(item.executor_ids)
+    existing_user_ids = await get_existing_user_ids(user_ids, db)
+
+    results = [None] * len(batch.items)
+    valid_items = []
+    for index, item in enumerate(batch.items):
+        if item.responsible_id in existing_user_ids:
+            valid_items.append((index, item))
+        else:
+            results[index] = responsible_not_found(index, item.responsible_id)
+
+    if valid_items:
+        # Multi-row INSERT ... RETURNING, rows come back in parameter order
+        new_tasks = (await db.execute(
+            insert(Task).returning(Task, sort_by_parameter_order=True),
+            [item.model_dump(exclude={"executor_ids"}) for _, item in valid_items]
+        )).scalars().all()
+
+        task_executors = []
+        for (index, item), new_task in zip(valid_items, new_tasks):
+            new_task.executor_ids = sorted(set(item.executor_ids) & existing_user_ids)
+            task_executors.extend(
+                {"task_id": new_task.id, "user_id": user_id} for user_id in new_task.executor_ids
+            )
+            results[index] = TaskBatchResult(
+                index=index,
+                id=new_task.id,
+                status_code=status.HTTP_200_OK,
+                task=TaskOut.model_validate(new_task)
+            )
+        if task_executors:
+            await db.execute(insert(TaskExecutors), task_executors)
+        mark_tasks_changed(db)
+        await db.commit()
+
+    return results
+
+
+@router.put("/tasks:batch", response_model=List[TaskBatchResult], dependencies=[Depends(permission_required(PermissionName.UPDATE_TASK))])
+async def update_tasks_batch(batch: TaskBatchUpdate, db: AsyncSession = Depends(get_db)):
+    task_ids = {item.id for item in batch.items}
+    tasks = {
+        task.id: task
+        for task in (await db.execute(select(Task).where(Task.id.in_(task_ids)))).scalars().all()
+    }
+
+    user_ids = set()
+    for item in batch.items:
+        if item.responsible_id is not None:
+            user_ids.add(item.responsible_id)
+        user_ids.update(item.executor_ids or [])
+    existing_user_ids = await get_existing_user_ids(user_ids, db)
+
+    results = [None] * len(batch.items)
+    updated = []
+    new_executor_ids = {}
+    for index, item in enumerate(batch.items):
+        task = tasks.get(item.id)
+        if task is None:
+            results[index] = TaskBatchResult(
+                index=index,
+                id=item.id,
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+            continue
+
+        update_data = item.model_dump(exclude_unset=True, exclude={"id"})
+        null_fields = [field for field in NOT_NULL_UPDATE_FIELDS if field in update_data and update_data[field] is None]
+        if null_fields:
+            results[index] = TaskBatchResult(
+                index=index,
+                id=item.id,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Fields cannot be null: {', '.join(null_fields)}"
+            )
+            continue
+        if "responsible_id" in update_data and update_data["responsible_id"] not in existing_user_ids:
+            results[index] = responsible_not_found(index, update_data["responsible_id"], item.id)
+            continue
+
+        for field, value in update_data.items():
+            if field != "executor_ids":
+                setattr(task, field, value)
+        if item.executor_ids is not None:
+            new_executor_ids[task.id] = sorted(set(item.executor_ids) & existing_user_ids)
+        updated.append((index, task))
+
+    if new_executor_ids:
+        for task_id in new_executor_ids:
+            bump_version(tasks[task_id])
+        await db.execute(delete(TaskExecutors).where(TaskExecutors.task_id.in_(new_executor_ids)))
+        mark_tasks_changed(db)
+        task_executors = [
+            {"task_id": task_id, "user_id": user_id}
+            for task_id, executor_ids in new_executor_ids.items()
+            for user_id in executor_ids
+        ]
+        if task_executors:
+            await db.execute(insert(TaskExecutors), task_executors)
+    await db.commit()
+
+    executor_ids = await get_executor_ids(
+        list({task.id for _, task in updated} - new_executor_ids.keys()), db
+    )
+    executor_ids.update(new_executor_ids)
+
+    for index, task in updated:
+        task.executor_ids = executor_ids[task.id]
+        results[index] = TaskBatchResult(
+            index=index,
+            id=task.id,
+            status_code=status.HTTP_200_OK,
+            task=TaskOut.model_validate(task)
+        )
+
+    return results
+
+
+@router.delete("/tasks:batch", response_model=List[TaskBatchResult], dependencies=[Depends(permission_required(PermissionName.DELETE_TASK))])
+async def delete_tasks_batch(batch: TaskBatchDelete, db: AsyncSession = Depends(get_db)):
+    existing_ids = set((await db.execute(
+        select(Task.id).where(Task.id.in_(batch.ids))
+    )).scalars().all())
+
+    if existing_ids:
+        await db.execute(delete(TaskExecutors).where(TaskExecutors.task_id.in_(existing_ids)))
+        await db.execute(delete(Task).where(Task.id.in_(existing_ids)))
+        mark_tasks_changed(db)
+        await db.commit()
+
+    return [
+        TaskBatchResult(index=index, id=task_id, status_code=status.HTTP_200_OK, detail="Task deleted")
+        if task_id in existing_ids else
+        TaskBatchResult(index=index, id=task_id, status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        for index, task_id in enumerate(batch.ids)
+    ]
+
+
+@router.post("/tasks/import", response_model=TaskImportResult, dependencies=[Depends(permission_required(PermissionName.CREATE_TASK))])
+async def import_tasks_file(
+    request: Request,
+    import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import tasks from an NDJSON or CSV request body.
+
+    The body is spooled to a temporary file as it arrives and then read
+    line by line, so the whole upload is never held in memory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        lines = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        try:
+            return await import_tasks(db, lines, import_format)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not valid UTF-8")
+        finally:
+            lines.detach()
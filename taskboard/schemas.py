@@ -1,8 +1,9 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from enum import Enum
 
 from common.constants import TaskStatus, TaskPriority
+from settings import TASK_BATCH_MAX_SIZE
 
 
 class TaskCreate(BaseModel):
@@ -31,3 +32,41 @@ class TaskOut(BaseModel):
     executor_ids: List[int]
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+    id: int
+
+
+# TaskUpdate fields backed by NOT NULL columns, they may be omitted but not null
+NOT_NULL_UPDATE_FIELDS = ("title", "status", "priority")
+
+
+class TaskBatchCreate(BaseModel):
+    items: List[TaskCreate] = Field(min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+class TaskBatchUpdate(BaseModel):
+    items: List[TaskBatchUpdateItem] = Field(min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+class TaskBatchDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+class TaskBatchResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status_code: int
+    task: Optional[TaskOut] = None
+    detail: Optional[str] = None
+
+
+class TaskImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class TaskImportResult(BaseModel):
+    imported: int
+    errors: List[TaskImportError]
@@ -0,0 +1,84 @@
+import re
+
+from sqlalchemy import DDL, event, false, func, literal, literal_column, or_, select, table, column
+
+from .models import Task
+
+# Language-neutral configuration, task texts are not all in one language
+SEARCH_CONFIG = "simple"
+
+# Postgres: generated tsvector column with a GIN index. Neither is in the
+# model metadata, alembic/env.py keeps autogenerate from dropping them
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+]
+
+# SQLite: external content FTS5 table kept in sync by triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+
+def fts5_match_expression(q: str) -> str:
+    # Quote every word so user input is never parsed as FTS5 query syntax
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def apply_search(query, q: str, dialect_name: str):
+    """Restrict a ``select(Task)`` query to tasks matching ``q``.
+
+    Adds a ``rank`` column, higher is a better match, that can be used
+    in ``order_by``.
+    """
+    if dialect_name == "postgresql":
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        search_vector = literal_column("tasks.search_vector")
+        return (
+            query.where(search_vector.op("@@")(ts_query))
+            .add_columns(func.ts_rank(search_vector, ts_query).label("rank"))
+        )
+
+    if dialect_name == "sqlite":
+        match_expression = fts5_match_expression(q)
+        if not match_expression:
+            return query.where(false()).add_columns(literal(0.0).label("rank"))
+        fts_table = literal_column("tasks_fts")
+        # bm25() only works in a plain query over the FTS table, so rank the
+        # matches in a subquery. It is lower for better matches, title counts double.
+        matches = (
+            select(tasks_fts.c.rowid.label("task_id"), (-func.bm25(fts_table, 2.0, 1.0)).label("rank"))
+            .where(fts_table.op("MATCH")(match_expression))
+            .subquery("tasks_fts_matches")
+        )
+        return query.join(matches, matches.c.task_id == Task.id).add_columns(matches.c.rank)
+
+    return (
+        query.where(or_(
+            Task.title.icontains(q, autoescape=True),
+            Task.description.icontains(q, autoescape=True)
+        ))
+        .add_columns(literal(0.0).label("rank"))
+    )
@@ -0,0 +1,52 @@
+from itertools import chain
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Task, TaskExecutors, TableVersion
+
+_TASKS_CHANGED_KEY = "tasks_changed"
+
+
+def mark_tasks_changed(db: AsyncSession):
+    """Flag a transaction that changes tasks with Core statements.
+
+    ORM changes of Task and TaskExecutors are detected on flush.
+    """
+    db.info[_TASKS_CHANGED_KEY] = True
+
+
+async def get_tasks_version(db: AsyncSession) -> int:
+    version = (await db.execute(
+        select(TableVersion.version).where(TableVersion.name == Task.__tablename__)
+    )).scalar()
+    return version or 0
+
+
+def _detect_task_changes(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Task, TaskExecutors)):
+            session.info[_TASKS_CHANGED_KEY] = True
+            return
+
+
+def _bump_tasks_version(session):
+    # The final flush of commit() runs after this hook, do it here instead
+    session.flush()
+    if session.info.pop(_TASKS_CHANGED_KEY, False):
+        # Last statement of the transaction, keeps the counter row locked briefly
+        session.execute(
+            update(TableVersion)
+            .where(TableVersion.name == Task.__tablename__)
+            .values(version=TableVersion.version + 1)
+        )
+
+
+def _discard_task_changes(session):
+    session.info.pop(_TASKS_CHANGED_KEY, None)
+
+
+event.listen(Session, 'after_flush', _detect_task_changes)
+event.listen(Session, 'before_commit', _bump_tasks_version)
+event.listen(Session, 'after_rollback', _discard_task_changes)
@@ -1,42 +1,122 @@
+import os
+import tempfile
+
+TEST_DB_PATH = os.path.join(tempfile.gettempdir(), "taskflow_test.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
+os.environ["OUTBOX_WORKER_ENABLED"] = "false"
+os.environ["TOKEN_PURGE_ENABLED"] = "false"
+# Cheapest bcrypt cost, hashing dominates the suite otherwise
+os.environ["PASSWORD_BCRYPT_ROUNDS"] = "4"
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from main import app
-from database import Base, get_db
+from database import Base, get_db, instrument_engine
+from scripts.seed_data import seed_data
+from security.permissions import invalidate_permission_cache
+from security.tokens import invalidate_token
+
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Start from an empty file, drop_all() leaves e.g. ANALYZE statistics behind
+for path in (TEST_DB_PATH, f"{TEST_DB_PATH}-wal", f"{TEST_DB_PATH}-shm"):
+    if os.path.exists(path):
+        os.remove(path)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL,connect_args={"check_same_thread": False})
+# Sync engine for preparing test data, async engine for the application
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+async_engine = create_async_engine(os.environ["DATABASE_URL"], poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+# Count the test engine's statements in the request metrics
+instrument_engine(async_engine)
+
+with engine.connect() as connection:
+    # Let the test session read while the application writes
+    connection.exec_driver_sql("PRAGMA journal_mode=WAL")
 
 
 @pytest.fixture(scope="function")
 def db_session():
     """A database fixture that cleans all data before each test."""
-    connection = engine.connect()
-    transaction = connection.begin()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    invalidate_permission_cache()
+    invalidate_token()
 
-    session = TestingSessionLocal(bind=connection, expire_on_commit=False)
-    Base.metadata.create_all(bind=connection)
+    session = TestingSessionLocal(expire_on_commit=False)
 
     yield session
 
     session.close()
-    transaction.rollback()
-    connection.close()
 
 @pytest.fixture(scope="function")
 def client(db_session):
     """FastAPI client fixture with test database."""
-    def get_db_override():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+    async def get_db_override():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_db_override
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def query_log():
+    """Collects the SQL statements the application sends to the database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+# Size of the generated dataset behind the seeded_* fixtures
+SEEDED_TASKS = int(os.getenv("SEEDED_TASKS", 10000))
+
+
+@pytest.fixture(scope="session")
+def seeded_database_path(tmp_path_factory):
+    return tmp_path_factory.mktemp("seeded") / "seeded.db"
+
+
+@pytest.fixture(scope="session")
+def seeded_dataset(seeded_database_path):
+    """A large generated dataset in a database of its own, built once per session.
+
+    Tests must not change it; users log in with the SEED_PASSWORD.
+    """
+    seeded_engine = create_engine(f"sqlite:///{seeded_database_path}")
+    Base.metadata.create_all(bind=seeded_engine)
+    with Session(seeded_engine) as session:
+        result = seed_data(session, users=max(10, SEEDED_TASKS // 100), tasks=SEEDED_TASKS)
+    seeded_engine.dispose()
+    return result
+
+
+@pytest.fixture(scope="function")
+def seeded_client(seeded_dataset, seeded_database_path):
+    """FastAPI client fixture backed by the seeded dataset."""
+    seeded_async_engine = create_async_engine(f"sqlite+aiosqlite:///{seeded_database_path}", poolclass=NullPool)
+    seeded_sessions = async_sessionmaker(bind=seeded_async_engine, autoflush=False, expire_on_commit=False)
+    invalidate_permission_cache()
+    invalidate_token()
+
+    async def get_db_override():
+        async with seeded_sessions() as db:
+            yield db
 
     app.dependency_overrides[get_db] = get_db_override
     with TestClient(app) as client:
         yield client
+    app.dependency_overrides.clear()
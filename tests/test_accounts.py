@@ -1,8 +1,15 @@
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
-from sqlalchemy import select
+from passlib.context import CryptContext
+from sqlalchemy import select, update
 
-from accounts.models import User, Role, RoleName
+from accounts.models import User, Role, RoleName, Token
 from accounts.routes import get_password_hash
+from security import tokens
+from security.passwords import pwd_context
+from tests.conftest import AsyncTestingSessionLocal
 
 
 def test_register_new_user(client, db_session):
@@ -100,3 +107,98 @@ def test_login_invalid_password(client, db_session):
 
     assert response.status_code == 400
     assert response.json() == {"detail": "Invalid credentials"}
+
+
+def test_logout_invalidates_token(client, db_session):
+    user_data = {
+        "email": "logoutuser@example.com",
+        "password": "password123",
+        "first_name": "Test",
+        "last_name": "User"
+    }
+    token = client.post("/accounts/register", json=user_data).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/accounts/logout", headers=headers)
+    assert response.status_code == 200
+
+    response = client.post("/accounts/logout", headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid or expired token"}
+
+
+def test_login_rehashes_stale_password_hash(client, db_session):
+    stale_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)
+    test_user = User(
+        email="rehash@example.com",
+        password=stale_context.hash("password123"),
+        first_name="Test",
+        last_name="User"
+    )
+    db_session.add(test_user)
+    db_session.commit()
+
+    response = client.post("/accounts/login", json={"email": "rehash@example.com", "password": "password123"})
+    assert response.status_code == 200
+
+    db_session.refresh(test_user)
+    assert not pwd_context.needs_update(test_user.password)
+    assert pwd_context.verify("password123", test_user.password)
+
+
+def register(client, email):
+    user_data = {"email": email, "password": "password123", "first_name": "Test", "last_name": "User"}
+    return client.post("/accounts/register", json=user_data).json()["token"]
+
+
+def test_expired_token_is_rejected(client, db_session):
+    token = register(client, "expiry@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    # An unknown task with a valid token, 401 once the token is expired
+    assert client.get("/taskboard/tasks/999", headers=headers).status_code == 404
+
+    # Issued TOKEN_TTL seconds ago minus one, so it is cached for at most a second
+    db_session.execute(update(Token).values(issued_at=datetime.utcnow() - timedelta(seconds=tokens.TOKEN_TTL - 1)))
+    db_session.commit()
+    tokens.invalidate_token()
+    assert client.get("/taskboard/tasks/999", headers=headers).status_code == 404
+    assert tokens.token_cache_ttl(datetime.utcnow() - timedelta(seconds=tokens.TOKEN_TTL - 1)) <= 1
+
+    db_session.execute(update(Token).values(issued_at=datetime.utcnow() - timedelta(seconds=tokens.TOKEN_TTL + 1)))
+    db_session.commit()
+    tokens.invalidate_token()
+    response = client.get("/taskboard/tasks/999", headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid or expired token"}
+
+
+def test_login_drops_tokens_over_the_per_user_cap(client, db_session, monkeypatch):
+    monkeypatch.setattr("accounts.routes.TOKEN_MAX_PER_USER", 3)
+    first_token = register(client, "cap@example.com")
+    logins = [
+        client.post("/accounts/login", json={"email": "cap@example.com", "password": "password123"}).json()["token"]
+        for _ in range(3)
+    ]
+
+    assert set(db_session.execute(select(Token.token)).scalars()) == set(logins)
+    assert client.get("/taskboard/tasks/999", headers={"Authorization": f"Bearer {first_token}"}).status_code == 401
+
+    # 0 turns the cap off, no login removes any token
+    monkeypatch.setattr("accounts.routes.TOKEN_MAX_PER_USER", 0)
+    new_token = client.post("/accounts/login", json={"email": "cap@example.com", "password": "password123"}).json()["token"]
+    assert set(db_session.execute(select(Token.token)).scalars()) == {*logins, new_token}
+
+
+def test_purge_deletes_expired_tokens_in_batches(client, db_session):
+    for index in range(5):
+        register(client, f"purge{index}@example.com")
+    expired = datetime.utcnow() - timedelta(seconds=tokens.TOKEN_TTL + 60)
+    db_session.execute(update(Token).where(Token.id <= 3).values(issued_at=expired))
+    db_session.commit()
+
+    async def purge():
+        async with AsyncTestingSessionLocal() as db:
+            return await tokens.purge_expired_tokens(db, batch_size=2)
+
+    assert asyncio.run(purge()) == 3
+    assert sorted(db_session.execute(select(Token.id)).scalars()) == [4, 5]
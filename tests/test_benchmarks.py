@@ -0,0 +1,17 @@
+import asyncio
+
+from benchmarks.cases import CASES
+from benchmarks.runner import find_regressions, run_benchmarks
+
+
+def test_benchmark_cases_run(tmp_path):
+    report = asyncio.run(run_benchmarks(
+        f"sqlite+aiosqlite:///{tmp_path / 'benchmarks.db'}", [200], rounds=2, warmup=0, log=lambda message: None
+    ))
+    results = report["results"]["200"]
+    assert results.keys() == CASES.keys()
+    assert all(stats["rounds"] == 2 and stats["median"] > 0 for stats in results.values())
+
+    slower = {"results": {"200": {name: dict(stats, median=stats["median"] * 2) for name, stats in results.items()}}}
+    assert find_regressions(report, report, threshold=0.2) == []
+    assert len(find_regressions(report, slower, threshold=0.2)) == len(CASES)
@@ -0,0 +1,83 @@
+import asyncio
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import database
+from accounts.models import User
+from common.constants import RoleName
+from database import get_db
+from main import app
+from scripts.initialize_permissions import initialize_permissions
+from tests.conftest import async_engine
+from tests.test_tasks import create_test_user
+
+
+def test_reads_go_to_replica_except_after_own_writes(client, db_session, monkeypatch):
+    replica_sessions_opened = []
+    replica_sessionmaker = async_sessionmaker(bind=async_engine, expire_on_commit=False, info={"replica": True})
+
+    def open_replica_session():
+        replica_sessions_opened.append(True)
+        return replica_sessionmaker()
+
+    monkeypatch.setattr(database, "replica_sessions", [open_replica_session])
+    database.recent_writers.clear()
+    # The application's own get_db marks writers, it uses the same test database
+    app.dependency_overrides.pop(get_db)
+
+    create_test_user(db_session, "replica@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(select(User).where(User.email == "replica@example.com")).scalars().one()
+
+    # The fresh token is found on the primary when the replica lookup misses
+    token = client.post("/accounts/login", json={"email": "replica@example.com", "password": "password123"}).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    task = client.post("/taskboard/tasks", json={"title": "Task", "responsible_id": test_user.id}, headers=headers).json()
+    replica_sessions_opened.clear()
+
+    # Within the stickiness window the writer reads from the primary
+    assert client.get(f"/taskboard/tasks/{task['id']}", headers=headers).status_code == 200
+    assert replica_sessions_opened == []
+
+    # Anonymous reads and reads after the window go to the replica
+    assert client.get("/taskboard/tasks").status_code == 200
+    assert len(replica_sessions_opened) == 1
+    database.recent_writers.clear()
+    assert client.get(f"/taskboard/tasks/{task['id']}", headers=headers).status_code == 200
+    assert len(replica_sessions_opened) == 2
+
+    # Stickiness follows the user, not the token: a second device reads its own writes too
+    other_token = client.post("/accounts/login", json={"email": "replica@example.com", "password": "password123"}).json()["token"]
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+    # Unknown tokens read from the primary until get_current_user has cached them
+    assert client.get(f"/taskboard/tasks/{task['id']}", headers=other_headers).status_code == 200
+    assert len(replica_sessions_opened) == 2
+    assert client.get(f"/taskboard/tasks/{task['id']}", headers=other_headers).status_code == 200
+    assert len(replica_sessions_opened) == 3
+
+    assert client.put(f"/taskboard/tasks/{task['id']}", json={"title": "Renamed"}, headers=headers).status_code == 200
+    replica_sessions_opened.clear()
+    assert client.get(f"/taskboard/tasks/{task['id']}", headers=other_headers).status_code == 200
+    assert replica_sessions_opened == []
+
+
+def test_pool_stats_are_kept_per_engine(tmp_path):
+    async def run():
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}", poolclass=database.TimedQueuePool)
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=database.TimedQueuePool)
+        for _ in range(3):
+            async with primary.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        async with replica.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        stats = database.get_pool_stats(primary), database.get_pool_stats(replica)
+        await primary.dispose()
+        await replica.dispose()
+        return stats
+
+    primary_stats, replica_stats = asyncio.run(run())
+    assert primary_stats["pool"] == "TimedQueuePool"
+    assert primary_stats["checkouts"] == 3
+    assert replica_stats["checkouts"] == 1
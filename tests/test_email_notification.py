@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from accounts.models import User
+from common.constants import RoleName
+from email_notification import worker
+from email_notification.models import OutboxMessage
+from email_notification.worker import drain_outbox
+from scripts.initialize_permissions import initialize_permissions
+from tests.test_tasks import create_test_user
+
+
+def test_status_change_is_sent_through_outbox(client, db_session, monkeypatch):
+    create_test_user(db_session, "admin@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'admin@example.com')
+    ).scalars().first()
+
+    login_response = client.post("/accounts/login", json={
+        "email": "admin@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    task_data = {"title": "New Task", "responsible_id": test_user.id}
+    task = client.post("/taskboard/tasks", json=task_data, headers=headers).json()
+
+    response = client.put(f"/taskboard/tasks/{task['id']}", json={"status": "Done"}, headers=headers)
+    assert response.status_code == 200
+
+    message = db_session.execute(select(OutboxMessage)).scalars().one()
+    assert message.to_email == "admin@example.com"
+    assert "New Task" in message.subject
+    assert message.sent_at is None
+
+    sent = []
+    monkeypatch.setattr(worker, "send_email", lambda *args: sent.append(args))
+    assert asyncio.run(drain_outbox()) == 1
+
+    assert sent == [("admin@example.com", message.subject, message.body)]
+    db_session.expire_all()
+    message = db_session.execute(select(OutboxMessage)).scalars().one()
+    assert message.sent_at is not None
+    assert message.next_attempt_at is None
+    assert asyncio.run(drain_outbox()) == 0
+
+
+def test_failed_email_is_retried_later(client, db_session, monkeypatch):
+    db_session.add(OutboxMessage(to_email="user@example.com", subject="Subject", body="Body"))
+    db_session.commit()
+
+    def failing_send_email(to_email, subject, body):
+        raise ConnectionError("SMTP is down")
+
+    monkeypatch.setattr(worker, "send_email", failing_send_email)
+    assert asyncio.run(drain_outbox()) == 1
+
+    db_session.expire_all()
+    message = db_session.execute(select(OutboxMessage)).scalars().one()
+    assert message.attempts == 1
+    assert message.sent_at is None
+    assert message.next_attempt_at > datetime.utcnow()
+    assert "SMTP is down" in message.last_error
+
+    # Not due yet
+    assert asyncio.run(drain_outbox()) == 0
+
+
+def test_claimed_messages_are_leased(client, db_session):
+    db_session.add(OutboxMessage(to_email="user@example.com", subject="Subject", body="Body"))
+    db_session.commit()
+
+    # A worker that dies after claiming leaves the message to the next one once the lease ends
+    assert len(asyncio.run(worker.claim_messages(10))) == 1
+    assert asyncio.run(worker.claim_messages(10)) == []
+
+    message = db_session.execute(select(OutboxMessage)).scalars().one()
+    assert message.attempts == 1
+    assert message.sent_at is None
+    assert message.next_attempt_at > datetime.utcnow()
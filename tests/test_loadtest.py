@@ -0,0 +1,15 @@
+import asyncio
+
+from loadtest.runner import run_load
+
+
+def test_load_generator_runs_in_process(db_session):
+    report = asyncio.run(run_load(
+        users=3, writers=1, concurrency=3, duration=0.5,
+        mix={"login": 1, "list": 2, "create": 2, "get": 2, "update_status": 1, "delete": 1}
+    ))
+    assert report["requests"] > 0
+    routes = report["routes"]
+    assert routes["POST /taskboard/tasks"]["statuses"].get("200")
+    assert routes["POST /accounts/login"]["error_rate"] == 0
+    assert {"p50", "p95", "p99", "throughput"} <= routes["GET /taskboard/tasks"].keys()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import pstats
+import time
+
+import orjson
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from accounts.models import User
+from common.constants import RoleName
+from email_notification.models import OutboxMessage
+from scripts.initialize_permissions import initialize_permissions
+from main import app
+from monitoring.profiling import ProfilingMiddleware
+from monitoring.tracing import TraceExporter, TracingMiddleware, span, start_trace
+from monitoring.slow_queries import normalize_sql, request_scope, slow_query_log
+from tests.conftest import async_engine
+from tests.test_tasks import create_test_user
+
+
+def login(client, email):
+    login_response = client.post("/accounts/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+
+def create_super_user(db_session, email):
+    create_test_user(db_session, email, "password123", RoleName.USER)
+    user = db_session.execute(select(User).where(User.email == email)).scalars().one()
+    user.super_user = True
+    db_session.commit()
+
+
+def test_db_pool_stats_require_super_user(client, db_session):
+    create_test_user(db_session, "admin@example.com", "password123", RoleName.ADMIN)
+    create_super_user(db_session, "root@example.com")
+
+    assert client.get("/monitoring/db-pool").status_code == 401
+    assert client.get("/monitoring/db-pool", headers=login(client, "admin@example.com")).status_code == 403
+
+    response = client.get("/monitoring/db-pool", headers=login(client, "root@example.com"))
+    assert response.status_code == 200
+    stats = response.json()["primary"]
+    assert stats["pool"] == "NullPool"
+    assert {"checkouts", "timeouts", "wait_time_avg", "wait_time_max"} <= stats.keys()
+
+
+def test_metrics_use_route_templates_and_count_queries(client, db_session):
+    create_test_user(db_session, "user@example.com", "password123", RoleName.USER)
+    headers = login(client, "user@example.com")
+
+    assert client.get("/taskboard/tasks/424242", headers=headers).status_code == 404
+    client.get("/no-such-page")
+    client.request("FOO", "/no-such-page")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'taskflow_http_requests_total{method="GET",route="/taskboard/tasks/{task_id}",status="404"}' in body
+    assert 'route="unmatched"' in body
+    assert 'taskflow_http_requests_total{method="other",route="unmatched",status="404"}' in body
+    assert 'method="FOO"' not in body
+    assert "/taskboard/tasks/424242" not in body
+    # The token and task lookups run at least two statements
+    queries = next(
+        line for line in body.splitlines()
+        if line.startswith('taskflow_db_queries_per_request_sum{method="GET",route="/taskboard/tasks/{task_id}"}')
+    )
+    assert float(queries.split()[-1]) >= 2
+    assert 'taskflow_cache_hits_total{cache="token"}' in body
+    assert "# TYPE taskflow_cache_hits_total counter" in body
+
+
+def test_metrics_read_outbox_queue_depth_from_table(client, db_session):
+    # No worker runs in the tests, the depth must still be current
+    db_session.add(OutboxMessage(to_email="user@example.com", subject="Subject", body="Body"))
+    db_session.commit()
+
+    assert "taskflow_outbox_queue_depth 1" in client.get("/metrics").text
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM tasks\n WHERE id IN (?, ?, ?) AND title = 'a''b' LIMIT 10") == (
+        "SELECT * FROM tasks WHERE id IN (?, ...) AND title = ? LIMIT ?"
+    )
+
+
+def test_slow_query_log_captures_plan(client, db_session, monkeypatch, caplog):
+    create_test_user(db_session, "user@example.com", "password123", RoleName.USER)
+    headers = login(client, "user@example.com")
+    monkeypatch.setattr(slow_query_log, "enabled", True)
+    monkeypatch.setattr(slow_query_log, "threshold", 0)
+    slow_query_log.recently_explained.clear()
+
+    with caplog.at_level(logging.WARNING, logger="monitoring.slow_queries"):
+        assert client.get("/taskboard/tasks", params={"order_by": "-priority"}, headers=headers).status_code == 200
+        # Plans are captured in the background
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            entries = [
+                record.slow_query for record in caplog.records
+                if "plan" in record.slow_query and "FROM tasks" in record.slow_query["statement"]
+            ]
+            if entries:
+                break
+            time.sleep(0.05)
+
+    entry = entries[0]
+    assert entry["route"] == "/taskboard/tasks"
+    assert entry["parameters"].startswith("(")
+    assert "not available" not in entry["plan"]
+    assert "tasks" in entry["plan"]
+
+
+def test_slow_query_route_does_not_need_metrics(monkeypatch, caplog):
+    monkeypatch.setattr(slow_query_log, "enabled", True)
+    monkeypatch.setattr(slow_query_log, "threshold", 0)
+    # Already explained, so the entry is logged right away
+    slow_query_log.recently_explained.set("SELECT ?", True)
+
+    async def run_statement():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # Only the request scope is set, as with METRICS_ENABLED=false
+    reset_token = request_scope.set({"route": APIRoute("/things/{thing_id}", endpoint=lambda: None)})
+    try:
+        with caplog.at_level(logging.WARNING, logger="monitoring.slow_queries"):
+            asyncio.run(run_statement())
+    finally:
+        request_scope.reset(reset_token)
+
+    entry = next(record.slow_query for record in caplog.records if record.slow_query["statement"] == "SELECT ?")
+    assert entry["route"] == "/things/{thing_id}"
+
+def test_profiling_is_limited_to_super_users(client, db_session, tmp_path):
+    create_test_user(db_session, "admin@example.com", "password123", RoleName.ADMIN)
+    create_super_user(db_session, "root@example.com")
+    profiled_client = TestClient(ProfilingMiddleware(app, directory=str(tmp_path)))
+
+    response = profiled_client.get("/taskboard/tasks", headers={**login(client, "admin@example.com"), "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+    headers = login(client, "root@example.com")
+    assert "X-Profile-Id" not in profiled_client.get("/taskboard/tasks", headers=headers).headers
+
+    response = profiled_client.get("/taskboard/tasks", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    stats = pstats.Stats(str(tmp_path / f"{profile_id}.prof"))
+    assert "get_all_tasks" in {function_name for _, _, function_name in stats.stats}
+    assert (tmp_path / f"{profile_id}.txt").read_text().startswith("GET /taskboard/tasks")
+
+
+def test_traces_follow_traceparent_through_request_stages(client, db_session):
+    create_test_user(db_session, "admin@example.com", "password123", RoleName.ADMIN)
+    create_super_user(db_session, "root@example.com")
+    initialize_permissions(db_session)
+    admin = db_session.execute(select(User).where(User.email == "admin@example.com")).scalars().one()
+    headers = login(client, "admin@example.com")
+    task = client.post("/taskboard/tasks", json={"title": "Task", "responsible_id": admin.id}, headers=headers).json()
+    traced_client = TestClient(TracingMiddleware(app))
+
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    response = traced_client.put(
+        f"/taskboard/tasks/{task['id']}",
+        json={"status": "Done", "executor_ids": [admin.id]},
+        headers={**headers, "traceparent": f"00-{trace_id}-{parent_id}-01"}
+    )
+    assert response.status_code == 200
+    assert response.headers["traceparent"].startswith(f"00-{trace_id}-")
+
+    assert client.get(f"/monitoring/traces/{trace_id}", headers=headers).status_code == 403
+    trace = client.get(f"/monitoring/traces/{trace_id}", headers=login(client, "root@example.com")).json()
+    spans = {span["name"]: span for span in trace["spans"]}
+    root = spans["PUT /taskboard/tasks/{task_id}"]
+    assert root["parent_id"] == parent_id
+    assert root["attributes"]["status"] == 200
+    assert {"get_current_user", "permission_required", "assign_executors", "after_update_listener", "db"} <= spans.keys()
+    assert spans["permission_required"]["parent_id"] == root["span_id"]
+    assert spans["get_current_user"]["parent_id"] in {root["span_id"], spans["permission_required"]["span_id"]}
+
+
+def test_trace_export_is_written_by_a_background_thread(tmp_path):
+    exporter = TraceExporter(str(tmp_path / "traces.jsonl"))
+    with start_trace("job") as root:
+        with span("step"):
+            pass
+    exporter.export(root.trace)
+    exporter.flush()
+
+    (line,) = (tmp_path / "traces.jsonl").read_bytes().splitlines()
+    exported = orjson.loads(line)
+    assert exported["trace_id"] == root.trace.trace_id
+    assert [exported_span["name"] for exported_span in exported["spans"]] == ["job", "step"]
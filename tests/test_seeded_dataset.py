@@ -0,0 +1,49 @@
+from sqlalchemy import select
+
+from database import Base
+from scripts.seed_data import SEED_PASSWORD, seed_data
+from taskboard.models import Task, TaskExecutors
+from tests.conftest import SEEDED_TASKS, engine
+
+
+def dump_tasks(db_session):
+    tasks = db_session.execute(
+        select(Task.id, Task.title, Task.status, Task.priority, Task.responsible_id).order_by(Task.id)
+    ).all()
+    executors = db_session.execute(
+        select(TaskExecutors.task_id, TaskExecutors.user_id).order_by(TaskExecutors.task_id, TaskExecutors.user_id)
+    ).all()
+    return tasks, executors
+
+
+def test_seed_data_is_deterministic(db_session):
+    result = seed_data(db_session, users=20, tasks=300, seed=7)
+    first = dump_tasks(db_session)
+    assert len(first[0]) == result.task_count == 300
+    assert len(result.user_ids) == 20
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_data(db_session, users=20, tasks=300, seed=7)
+    assert dump_tasks(db_session) == first
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_data(db_session, users=20, tasks=300, seed=8)
+    assert dump_tasks(db_session) != first
+
+
+def test_seeded_dataset(seeded_client, seeded_dataset):
+    response = seeded_client.get("/taskboard/tasks", params={"page_size": 100})
+    assert response.status_code == 200
+    assert int(response.headers["X-Total-Count"]) == SEEDED_TASKS
+
+    admin = seeded_client.post("/accounts/login", json={
+        "email": f"user{seeded_dataset.admin_id}@example.com",
+        "password": SEED_PASSWORD
+    })
+    assert admin.status_code == 200
+
+    last_page = (SEEDED_TASKS + 99) // 100
+    response = seeded_client.get("/taskboard/tasks", params={"page": last_page, "page_size": 100})
+    assert response.json()[-1]["id"] == SEEDED_TASKS
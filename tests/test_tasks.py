@@ -1,3 +1,8 @@
+import csv
+import io
+import json
+import threading
+
 from sqlalchemy import select
 
 import pytest
@@ -5,8 +10,11 @@ import pytest
 from accounts.models import Role, UserRole
 from accounts.routes import get_password_hash
 from common.constants import RoleName
-from taskboard.models import Task, User, TaskStatus, TaskPriority
+from taskboard import importer
+from taskboard.models import Task, TaskExecutors, User, TaskStatus, TaskPriority
 from scripts.initialize_permissions import initialize_permissions
+from pagination import encode_cursor
+from settings import PAGINATION_MAX_PAGE_SIZE
 
 # Function for creating test tasks
 def create_test_task(db_session, title, description, status, priority, responsible_user):
@@ -112,6 +120,37 @@ def test_get_tasks_pagination(client, db_session):
     assert tasks[0]["title"] == "Task 5"
 
 
+
+def test_get_tasks_total_count_options(client, db_session):
+    test_user = User(
+        email="testuser5@example.com",
+        password="password123",
+        first_name="Test",
+        last_name="User"
+    )
+    db_session.add(test_user)
+    db_session.commit()
+
+    for i in range(5):
+        create_test_task(db_session, f"Task {i+1}", f"Description {i+1}", TaskStatus.TODO, TaskPriority.HIGH, test_user)
+
+    response = client.get("/taskboard/tasks?page=4&page_size=2")
+    assert response.status_code == 200
+    assert response.json() == []
+    assert response.headers["X-Total-Count"] == "5"
+
+    response = client.get("/taskboard/tasks?page=1&page_size=2&include_total=false")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "X-Total-Count" not in response.headers
+    assert "X-Total-Pages" not in response.headers
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get("/taskboard/tasks?page=1&page_size=2&estimate_total=true")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "5"
+    assert "X-Total-Count-Estimated" not in response.headers
+
 def test_get_tasks_ordering(client, db_session):
     test_user = User(
         email="testuser3@example.com",
@@ -135,6 +174,228 @@ def test_get_tasks_ordering(client, db_session):
     assert tasks[2]["title"] == "Task A"
 
 
+
+def test_get_tasks_cursor_pagination(client, db_session):
+    test_user = User(
+        email="testuser4@example.com",
+        password="password123",
+        first_name="Test",
+        last_name="User"
+    )
+    db_session.add(test_user)
+    db_session.commit()
+
+    create_test_task(db_session, "Task A", "Description A", TaskStatus.TODO, TaskPriority.HIGH, test_user)
+    create_test_task(db_session, "Task B", "Description B", TaskStatus.DONE, TaskPriority.LOW, test_user)
+    create_test_task(db_session, "Task C", "Description C", TaskStatus.TODO, TaskPriority.LOW, test_user)
+    create_test_task(db_session, "Task D", "Description D", TaskStatus.DONE, TaskPriority.HIGH, test_user)
+    create_test_task(db_session, "Task E", "Description E", TaskStatus.TODO, TaskPriority.MEDIUM, test_user)
+
+    titles = []
+    response = client.get("/taskboard/tasks?order_by=status,-title&page_size=2")
+    first_cursor = response.headers["X-Next-Cursor"]
+    while True:
+        assert response.status_code == 200
+        titles.extend(task["title"] for task in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get(
+            "/taskboard/tasks",
+            params={"order_by": "status,-title", "page_size": 2, "cursor": next_cursor}
+        )
+
+    assert titles == ["Task D", "Task B", "Task E", "Task C", "Task A"]
+
+    # Cursor pages skip the count unless it is asked for
+    response = client.get(
+        "/taskboard/tasks", params={"order_by": "status,-title", "page_size": 2, "cursor": first_cursor}
+    )
+    assert response.status_code == 200
+    assert "X-Total-Count" not in response.headers
+    response = client.get(
+        "/taskboard/tasks",
+        params={"order_by": "status,-title", "page_size": 2, "cursor": first_cursor, "include_total": True}
+    )
+    assert response.headers["X-Total-Count"] == "5"
+
+    response = client.get(
+        "/taskboard/tasks",
+        params={"order_by": "title", "page_size": 2, "cursor": first_cursor}
+    )
+    assert response.status_code == 400
+
+
+def test_get_tasks_rejects_bad_ordering_and_cursor(client, db_session):
+    for order_by in ["nope", "title,", "rank"]:
+        response = client.get("/taskboard/tasks", params={"order_by": order_by})
+        assert response.status_code == 400
+
+    # Well-formed cursors with values that do not fit the columns
+    for values in [["NOPE", "Task A", 1], [["TODO"], "Task A", 1], ["TODO", {"x": 1}, 1], ["TODO", "Task A", "abc"]]:
+        response = client.get(
+            "/taskboard/tasks",
+            params={"order_by": "status,-title", "cursor": encode_cursor("status,-title", values)}
+        )
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid cursor"}
+
+    for values in [[{"x": 1}], [True], [1.5]]:
+        response = client.get("/taskboard/tasks", params={"cursor": encode_cursor(None, values)})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid cursor"}
+
+
+
+def test_get_tasks_filtering(client, db_session):
+    first_user = User(email="filter1@example.com", password="password123", first_name="Test", last_name="User")
+    second_user = User(email="filter2@example.com", password="password123", first_name="Test", last_name="User")
+    db_session.add_all([first_user, second_user])
+    db_session.commit()
+
+    create_test_task(db_session, "Task 1", None, TaskStatus.TODO, TaskPriority.HIGH, first_user)
+    task = create_test_task(db_session, "Task 2", None, TaskStatus.IN_PROGRESS, TaskPriority.LOW, first_user)
+    create_test_task(db_session, "Task 3", None, TaskStatus.DONE, TaskPriority.HIGH, second_user)
+    db_session.add(TaskExecutors(task_id=task.id, user_id=second_user.id))
+    db_session.commit()
+
+    def titles(params):
+        response = client.get("/taskboard/tasks", params=params)
+        assert response.status_code == 200
+        return [task["title"] for task in response.json()]
+
+    assert titles({"status": "TODO"}) == ["Task 1"]
+    assert titles({"status": ["TODO", "Done"]}) == ["Task 1", "Task 3"]
+    assert titles({"priority": "High", "responsible_id": second_user.id}) == ["Task 3"]
+    assert titles({"executor_id": second_user.id}) == ["Task 2"]
+    assert titles({"executor_id": first_user.id}) == []
+
+    response = client.get("/taskboard/tasks", params={"status": "Unknown"})
+    assert response.status_code == 422
+
+
+def test_get_tasks_search(client, db_session):
+    test_user = User(email="search@example.com", password="password123", first_name="Test", last_name="User")
+    db_session.add(test_user)
+    db_session.commit()
+
+    create_test_task(db_session, "Fix login page", "Users cannot log in", TaskStatus.TODO, TaskPriority.HIGH, test_user)
+    create_test_task(db_session, "Write docs", "Describe the login flow", TaskStatus.TODO, TaskPriority.LOW, test_user)
+    task = create_test_task(db_session, "Release", "Ship version 2", TaskStatus.DONE, TaskPriority.LOW, test_user)
+
+    def titles(params):
+        response = client.get("/taskboard/tasks", params=params)
+        assert response.status_code == 200
+        return [task["title"] for task in response.json()]
+
+    # Title matches rank above description matches
+    assert titles({"q": "login"}) == ["Fix login page", "Write docs"]
+    assert titles({"q": "login", "priority": "Low"}) == ["Write docs"]
+    assert titles({"q": "login", "order_by": "title"}) == ["Fix login page", "Write docs"]
+    assert titles({"q": "\"login flow"}) == ["Write docs"]
+    assert titles({"q": "release"}) == ["Release"]
+
+    task.title = "Deploy"
+    db_session.commit()
+    assert titles({"q": "release"}) == []
+    assert titles({"q": "deploy"}) == ["Deploy"]
+
+def test_get_tasks_query_count(client, db_session, query_log):
+    test_user = User(
+        email="testuser6@example.com",
+        password="password123",
+        first_name="Test",
+        last_name="User"
+    )
+    db_session.add(test_user)
+    db_session.commit()
+
+    for i in range(6):
+        task = create_test_task(db_session, f"Task {i+1}", None, TaskStatus.TODO, TaskPriority.HIGH, test_user)
+        db_session.add(TaskExecutors(task_id=task.id, user_id=test_user.id))
+    db_session.commit()
+
+    query_counts = []
+    for page_size in (1, 3, 6):
+        query_log.clear()
+        response = client.get(f"/taskboard/tasks?page_size={page_size}")
+        assert response.status_code == 200
+        assert all(task["executor_ids"] == [test_user.id] for task in response.json())
+        query_counts.append(len(query_log))
+
+    # Table version for the ETag, one page query (with the total) and one batched executor query
+    assert query_counts == [3, 3, 3]
+
+
+def test_get_tasks_conditional_requests(client, db_session, query_log):
+    create_test_user(db_session, "etag@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'etag@example.com')
+    ).scalars().first()
+    login_response = client.post("/accounts/login", json={
+        "email": "etag@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    task = client.post("/taskboard/tasks", headers=headers, json={
+        "title": "Task 1", "responsible_id": test_user.id
+    }).json()
+
+    response = client.get("/taskboard/tasks?page_size=5")
+    list_etag = response.headers["ETag"]
+    assert list_etag.startswith('W/"')
+
+    query_log.clear()
+    response = client.get("/taskboard/tasks?page_size=5", headers={"If-None-Match": list_etag})
+    assert response.status_code == 304
+    assert len(query_log) == 1
+
+    # Different parameters are a different representation
+    response = client.get("/taskboard/tasks?page_size=6", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+    response = client.get(f"/taskboard/tasks/{task['id']}", headers=headers)
+    task_etag = response.headers["ETag"]
+    response = client.get(f"/taskboard/tasks/{task['id']}", headers={**headers, "If-None-Match": task_etag})
+    assert response.status_code == 304
+
+    client.put(f"/taskboard/tasks/{task['id']}", headers=headers, json={"executor_ids": [test_user.id]})
+
+    response = client.get(f"/taskboard/tasks/{task['id']}", headers={**headers, "If-None-Match": task_etag})
+    assert response.status_code == 200
+    assert response.json()["executor_ids"] == [test_user.id]
+    response = client.get("/taskboard/tasks?page_size=5", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+    list_etag = response.headers["ETag"]
+
+    client.delete(f"/taskboard/tasks/{task['id']}", headers=headers)
+    response = client.get("/taskboard/tasks?page_size=5", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_task_version_is_bumped_in_sql(client, db_session):
+    create_test_user(db_session, "version@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(select(User).where(User.email == 'version@example.com')).scalars().first()
+    login_response = client.post("/accounts/login", json={
+        "email": "version@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+    task = create_test_task(db_session, "Task", "Description", TaskStatus.TODO, TaskPriority.LOW, test_user)
+    assert task.version == 1
+
+    # A concurrent writer updates the task after this session loaded version 1
+    assert client.put(f"/taskboard/tasks/{task.id}", headers=headers, json={"title": "Other"}).status_code == 200
+    task.title = "Mine"
+    db_session.commit()
+
+    db_session.expire_all()
+    assert db_session.get(Task, task.id).version == 3
+
 def test_create_task_success(client, db_session):
     create_test_user(db_session, "admin@example.com", "password123", RoleName.ADMIN)
     initialize_permissions(db_session)
@@ -207,3 +468,217 @@ def test_create_task_no_permission(client, db_session):
 
     assert response.status_code == 403
     assert response.json() == {"detail": "Not enough permissions"}
+
+
+def test_create_task_after_role_change(client, db_session):
+    create_test_user(db_session, "promoted@example.com", "password123", RoleName.USER)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'promoted@example.com')
+    ).scalars().first()
+
+    login_response = client.post("/accounts/login", json={
+        "email": "promoted@example.com",
+        "password": "password123"
+    })
+    token = login_response.json()["token"]
+
+    task_data = {
+        "title": "New Task",
+        "responsible_id": test_user.id,
+        "executor_ids": []
+    }
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/taskboard/tasks", json=task_data, headers=headers)
+    assert response.status_code == 403
+
+    admin_role = db_session.query(Role).filter(Role.name == RoleName.ADMIN).first()
+    user_role = db_session.query(UserRole).filter(UserRole.user_id == test_user.id).first()
+    user_role.role_id = admin_role.id
+    db_session.commit()
+
+    response = client.post("/taskboard/tasks", json=task_data, headers=headers)
+    assert response.status_code == 200
+
+
+def test_batch_create_update_delete(client, db_session):
+    create_test_user(db_session, "batch@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'batch@example.com')
+    ).scalars().first()
+
+    login_response = client.post("/accounts/login", json={
+        "email": "batch@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    response = client.post("/taskboard/tasks:batch", headers=headers, json={"items": [
+        {"title": "Task 1", "responsible_id": test_user.id, "executor_ids": [test_user.id, 999]},
+        {"title": "Task 2", "responsible_id": 999},
+        {"title": "Task 3", "responsible_id": test_user.id, "priority": TaskPriority.HIGH},
+    ]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status_code"] for result in results] == [200, 400, 200]
+    assert results[0]["task"]["executor_ids"] == [test_user.id]
+    assert results[1]["detail"] == "Responsible user with ID 999 not found."
+    assert results[2]["task"]["priority"] == TaskPriority.HIGH
+    first_id, third_id = results[0]["id"], results[2]["id"]
+
+    response = client.put("/taskboard/tasks:batch", headers=headers, json={"items": [
+        {"id": first_id, "status": TaskStatus.DONE},
+        {"id": third_id, "title": "Task 3 renamed", "executor_ids": [test_user.id]},
+        {"id": 999, "title": "Missing"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status_code"] for result in results] == [200, 200, 404]
+    assert results[0]["task"]["status"] == TaskStatus.DONE
+    assert results[0]["task"]["executor_ids"] == [test_user.id]
+    assert results[1]["task"]["title"] == "Task 3 renamed"
+    assert results[1]["task"]["executor_ids"] == [test_user.id]
+
+    response = client.request("DELETE", "/taskboard/tasks:batch", headers=headers, json={
+        "ids": [first_id, 999]
+    })
+    assert response.status_code == 200
+    assert [result["status_code"] for result in response.json()] == [200, 404]
+
+    titles = [task["title"] for task in client.get("/taskboard/tasks").json()]
+    assert titles == ["Task 3 renamed"]
+
+
+def test_batch_update_rejects_null_for_required_fields(client, db_session):
+    create_test_user(db_session, "batchnull@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'batchnull@example.com')
+    ).scalars().first()
+    task = create_test_task(db_session, "Task", None, TaskStatus.TODO, TaskPriority.LOW, test_user)
+
+    login_response = client.post("/accounts/login", json={
+        "email": "batchnull@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    response = client.put("/taskboard/tasks:batch", headers=headers, json={"items": [
+        {"id": task.id, "title": None},
+        {"id": task.id, "description": None, "priority": TaskPriority.HIGH},
+    ]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status_code"] for result in results] == [400, 200]
+    assert results[0]["detail"] == "Fields cannot be null: title"
+    assert results[1]["task"]["title"] == "Task"
+    assert results[1]["task"]["priority"] == TaskPriority.HIGH
+
+
+def test_export_tasks(client, db_session):
+    test_user = User(email="export@example.com", password="password123", first_name="Test", last_name="User")
+    db_session.add(test_user)
+    db_session.commit()
+
+    first = create_test_task(db_session, "Fix login page", "Users cannot log in", TaskStatus.TODO, TaskPriority.HIGH, test_user)
+    create_test_task(db_session, "Write docs", "Describe the login flow", TaskStatus.DONE, TaskPriority.LOW, test_user)
+    create_test_task(db_session, "Release", None, TaskStatus.TODO, TaskPriority.LOW, test_user)
+    db_session.add(TaskExecutors(task_id=first.id, user_id=test_user.id))
+    db_session.commit()
+
+    response = client.get("/taskboard/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert [task["title"] for task in tasks] == ["Fix login page", "Write docs", "Release"]
+    assert tasks[0]["status"] == "TODO"
+    assert tasks[0]["executor_ids"] == [test_user.id]
+    assert tasks[1]["executor_ids"] == []
+
+    response = client.get("/taskboard/tasks/export", params={"format": "csv", "q": "login", "priority": "Low"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "title", "description", "status", "priority", "responsible_id", "executor_ids"]
+    assert rows[1:] == [["2", "Write docs", "Describe the login flow", "Done", "Low", str(test_user.id), ""]]
+
+    response = client.get("/taskboard/tasks/export", params={"format": "xml"})
+    assert response.status_code == 422
+
+
+def test_get_tasks_page_size_limit(client, db_session):
+    assert client.get(f"/taskboard/tasks?page_size={PAGINATION_MAX_PAGE_SIZE}").status_code == 200
+    assert client.get(f"/taskboard/tasks?page_size={PAGINATION_MAX_PAGE_SIZE + 1}").status_code == 422
+
+
+def test_import_tasks(client, db_session):
+    create_test_user(db_session, "import@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    test_user = db_session.execute(
+        select(User).where(User.email == 'import@example.com')
+    ).scalars().first()
+
+    login_response = client.post("/accounts/login", json={
+        "email": "import@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    ndjson = "\n".join([
+        json.dumps({"title": "Task 1", "responsible_id": test_user.id, "executor_ids": [test_user.id]}),
+        json.dumps({"title": "Task 2", "responsible_id": 999}),
+        "{not json",
+        json.dumps({"title": "Task 3", "responsible_id": test_user.id, "status": "Done"}),
+    ])
+    response = client.post("/taskboard/tasks/import", headers=headers, content=ndjson)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    assert result["errors"][0]["detail"] == "Responsible user with ID 999 not found."
+
+    # The CSV columns of the export can be imported back
+    export = client.get("/taskboard/tasks/export", params={"format": "csv"}).text
+    export += f',Task 4,,Unknown,Low,{test_user.id},\n,Task 5,,TODO,Low,{test_user.id},{test_user.id} 998\n'
+    response = client.post("/taskboard/tasks/import", headers=headers, params={"format": "csv"}, content=export)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+    assert result["errors"][0]["detail"].startswith("status:")
+    assert result["errors"][1]["detail"] == "Executor users with IDs [998] not found."
+
+    tasks = client.get("/taskboard/tasks").json()
+    assert [task["title"] for task in tasks] == ["Task 1", "Task 3", "Task 1", "Task 3"]
+    assert [task["executor_ids"] for task in tasks] == [[test_user.id], [], [test_user.id], []]
+    assert tasks[3]["status"] == "Done"
+
+
+def test_import_validates_rows_off_the_event_loop(client, db_session, monkeypatch):
+    create_test_user(db_session, "import@example.com", "password123", RoleName.ADMIN)
+    initialize_permissions(db_session)
+    login_response = client.post("/accounts/login", json={
+        "email": "import@example.com",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {login_response.json()['token']}"}
+
+    validating_threads = set()
+    validate_row = importer.validate_row
+
+    def recording_validate_row(fields, user_ids):
+        validating_threads.add(threading.get_ident())
+        return validate_row(fields, user_ids)
+
+    monkeypatch.setattr(importer, "validate_row", recording_validate_row)
+    monkeypatch.setattr(importer, "TASK_IMPORT_CHUNK_SIZE", 1)
+
+    async def event_loop_thread():
+        return threading.get_ident()
+
+    loop_thread = client.portal.call(event_loop_thread)
+    ndjson = "\n".join(json.dumps({"title": f"Task {number}", "responsible_id": 999}) for number in range(3))
+    response = client.post("/taskboard/tasks/import", headers=headers, content=ndjson)
+    assert [error["row"] for error in response.json()["errors"]] == [1, 2, 3]
+    assert validating_threads and loop_thread not in validating_threads